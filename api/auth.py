@@ -0,0 +1,323 @@
+import hashlib
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from base import async_session
+from cache import LocalCache
+from config import config
+from models.api_key_model import ApiKey
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+TOKEN_PATTERN = re.compile(r"[a-zA-Z0-9]{32}")
+
+VALID = b"1"
+INVALID = b"0"
+
+# Refills the bucket of a token for the time elapsed since the last call,
+# then grants up to ARGV[3] tokens. Time comes from the Redis server so all
+# API processes share one clock.
+TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return granted
+"""
+
+
+def hash_token(token: str) -> str:
+    """
+    Digest an API key for storage and lookups.
+
+    Args:
+        token (str): Raw API key.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class AuthBackend(ABC):
+    """Store of valid API keys, looked up by their digest."""
+
+    @abstractmethod
+    async def verify(self, token_hash: str) -> bool:
+        """
+        Check whether a key is valid.
+
+        Args:
+            token_hash (str): Digest of the key.
+
+        Returns:
+            bool: True if the key is accepted.
+        """
+
+
+class PatternBackend(AuthBackend):
+    """Accepts every well-formed token; the format is checked by the verifier."""
+
+    async def verify(self, token_hash: str) -> bool:
+        return True
+
+
+class RedisKeyBackend(AuthBackend):
+    """Keys stored as digests in a Redis set."""
+
+    def __init__(self, client: Redis, key: str):
+        """
+        Initialize the backend.
+
+        Args:
+            client (Redis): Redis client.
+            key (str): Redis set holding the key digests.
+        """
+        self.client = client
+        self.key = key
+
+    async def verify(self, token_hash: str) -> bool:
+        return bool(await self.client.sismember(self.key, token_hash))
+
+
+class DBKeyBackend(AuthBackend):
+    """Keys stored as digests in the ``api_keys`` table."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        """
+        Initialize the backend.
+
+        Args:
+            session_factory (async_sessionmaker[AsyncSession]): Database sessions.
+        """
+        self.session_factory = session_factory
+
+    async def verify(self, token_hash: str) -> bool:
+        query = select(ApiKey.id).where(
+            ApiKey.key_hash == token_hash, ApiKey.active.is_(True)
+        )
+        async with self.session_factory() as session:
+            return (await session.execute(query.limit(1))).first() is not None
+
+
+class RateLimiter:
+    """
+    Per-token rate limit backed by a token bucket in Redis.
+
+    To avoid a Redis round-trip per request, every process takes ``lease``
+    tokens from the bucket at once and spends them locally. Leased tokens
+    expire after ``lease_ttl`` seconds, so a process cannot hoard them; the
+    limit is exact up to ``lease`` tokens per process.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        rate: float,
+        burst: int,
+        lease: int = 1,
+        lease_ttl: float = 1.0,
+        prefix: str = "ratelimit",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            client (Redis): Redis client.
+            rate (float): Tokens added per second.
+            burst (int): Bucket capacity.
+            lease (int): Tokens taken from Redis at once.
+            lease_ttl (float): Lifetime of locally held tokens in seconds.
+            prefix (str): Prefix of the bucket keys.
+            clock (Callable[[], float]): Monotonic time source.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.lease = max(1, min(lease, burst))
+        self.lease_ttl = lease_ttl
+        self.prefix = prefix
+        self.clock = clock
+        self._script = client.register_script(TOKEN_BUCKET)
+        self._leases: dict[str, tuple[float, int]] = {}
+
+    async def allow(self, key: str) -> bool:
+        """
+        Spend one token of ``key``'s bucket.
+
+        Redis errors let the request through: an unavailable limiter must
+        not take the API down.
+
+        Args:
+            key (str): Identifier of the bucket, e.g. a token digest.
+
+        Returns:
+            bool: False if the bucket is empty.
+        """
+        now = self.clock()
+        expires_at, remaining = self._leases.get(key, (0.0, 0))
+        if remaining > 0 and expires_at > now:
+            self._leases[key] = (expires_at, remaining - 1)
+            return True
+
+        try:
+            granted = int(
+                await self._script(
+                    keys=[f"{self.prefix}:{key}"],
+                    args=[self.rate, self.burst, self.lease],
+                )
+            )
+        except RedisError as e:
+            logger.warning("Rate limiter unavailable: %s", e)
+            return True
+
+        if len(self._leases) > config.auth.cache_max_entries:
+            self._leases = {k: v for k, v in self._leases.items() if v[0] > now}
+        if granted <= 0:
+            self._leases.pop(key, None)
+            return False
+        self._leases[key] = (now + self.lease_ttl, granted - 1)
+        return True
+
+
+class TokenVerifier:
+    """
+    Verifies API keys against a backend, caching the verdicts in-process.
+
+    Valid keys are cached for ``ttl`` seconds and invalid ones for
+    ``negative_ttl`` seconds, so a cached verdict costs a dictionary lookup
+    and a hash. Concurrent lookups of the same key share one backend call.
+    """
+
+    def __init__(
+        self,
+        backend: AuthBackend,
+        cache: LocalCache,
+        ttl: float,
+        negative_ttl: float,
+        limiter: RateLimiter | None = None,
+    ):
+        """
+        Initialize the verifier.
+
+        Args:
+            backend (AuthBackend): Store of valid keys.
+            cache (LocalCache): Cache of verdicts by key digest.
+            ttl (float): Lifetime of a cached valid verdict.
+            negative_ttl (float): Lifetime of a cached invalid verdict.
+            limiter (RateLimiter | None): Per-key rate limit, if any.
+        """
+        self.backend = backend
+        self.cache = cache
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.limiter = limiter
+
+    async def verify(self, token: str) -> str | None:
+        """
+        Check a key.
+
+        Args:
+            token (str): Raw key from the request.
+
+        Returns:
+            str | None: Digest of the key if it is valid, None otherwise.
+        """
+        if not TOKEN_PATTERN.fullmatch(token):
+            return None
+        token_hash = hash_token(token)
+        loaded = False
+
+        async def load() -> bytes:
+            nonlocal loaded
+            loaded = True
+            return VALID if await self.backend.verify(token_hash) else INVALID
+
+        verdict = await self.cache.get_or_load(token_hash, load, ttl=self.ttl)
+        if verdict == INVALID:
+            # Shorten the lifetime of a fresh invalid verdict only; doing it on
+            # every hit would keep rejecting a retrying client after its key
+            # is created.
+            if loaded:
+                self.cache.set(token_hash, verdict, self.negative_ttl)
+            return None
+        return token_hash
+
+    async def allow(self, token_hash: str) -> bool:
+        """
+        Apply the rate limit of a verified key.
+
+        Args:
+            token_hash (str): Digest returned by ``verify``.
+
+        Returns:
+            bool: False if the key exceeded its rate.
+        """
+        if self.limiter is None:
+            return True
+        return await self.limiter.allow(token_hash)
+
+
+def create_backend(redis_client: Redis | None = None) -> AuthBackend:
+    """
+    Create the key store selected by ``config.auth.backend``.
+
+    Args:
+        redis_client (Redis | None): Client for the Redis backend.
+
+    Returns:
+        AuthBackend: ``pattern``, ``redis`` or ``db`` backend.
+    """
+    if config.auth.backend == "redis":
+        client = redis_client or Redis.from_url(config.redis.url)
+        return RedisKeyBackend(client, f"{config.auth.prefix}:keys")
+    if config.auth.backend == "db":
+        return DBKeyBackend(async_session)
+    if config.auth.backend != "pattern":
+        raise ValueError(f"Unknown auth backend: {config.auth.backend}")
+    return PatternBackend()
+
+
+def create_verifier() -> TokenVerifier:
+    """Create the token verifier configured in ``config.auth``."""
+    redis_client = None
+    if config.auth.backend == "redis" or config.auth.rate_limit > 0:
+        redis_client = Redis.from_url(config.redis.url)
+
+    limiter = None
+    if redis_client is not None and config.auth.rate_limit > 0:
+        limiter = RateLimiter(
+            redis_client,
+            config.auth.rate_limit,
+            config.auth.burst,
+            lease=config.auth.lease,
+            prefix=f"{config.auth.prefix}:bucket",
+        )
+    return TokenVerifier(
+        create_backend(redis_client),
+        LocalCache(config.auth.cache_max_entries, config.auth.cache_ttl, tier="auth"),
+        ttl=config.auth.cache_ttl,
+        negative_ttl=config.auth.negative_ttl,
+        limiter=limiter,
+    )
+
+
+token_verifier = create_verifier()
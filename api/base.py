@@ -1,9 +1,178 @@
+import asyncio
+import logging
+import time
+from typing import Any
+from uuid import uuid4
+
 from config import config
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+
+class CountingQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that keeps track of callers waiting for a connection.
+
+    A checkout that finds an idle connection completes without yielding to
+    the event loop, so from the loop's point of view every checkout still
+    in progress is one that waits for the pool or for a new connection.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+            waited = time.monotonic() - started
+            if waited >= config.db.slow_checkout:
+                logger.warning(
+                    "Waited %.3fs for a DB connection (%s)", waited, self.status()
+                )
+
+
+def engine_options(url: str) -> dict[str, Any]:
+    """
+    Build the engine arguments for a database URL from ``config.db``.
+
+    In PgBouncer mode (transaction pooling) prepared statements are not
+    cached and get unique names, as a server connection may serve a
+    different client on every transaction.
+
+    Args:
+        url (str): Database URL.
+
+    Returns:
+        dict[str, Any]: Keyword arguments for ``create_async_engine``.
+    """
+    options: dict[str, Any] = {"future": True, "echo": config.debug}
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+
+    db = config.db
+    options.update(
+        poolclass=CountingQueuePool,
+        pool_size=db.pool_size,
+        max_overflow=db.max_overflow,
+        pool_timeout=db.pool_timeout,
+        pool_recycle=db.pool_recycle,
+        pool_pre_ping=db.pool_pre_ping,
+    )
+    if db.pgbouncer:
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        options["connect_args"] = {
+            "prepared_statement_cache_size": db.statement_cache_size,
+        }
+    return options
+
+
+def create_engine(url: str | None = None) -> AsyncEngine:
+    """
+    Create an async engine with the pool settings from the configuration.
+
+    Args:
+        url (str | None): Database URL, ``config.db.url`` by default.
+
+    Returns:
+        AsyncEngine: New engine.
+    """
+    url = url or config.db.url
+    return create_async_engine(url, **engine_options(url))
+
+
+def pool_stats(target: AsyncEngine | None = None) -> dict[str, int]:
+    """
+    Report the state of an engine's connection pool.
+
+    Args:
+        target (AsyncEngine | None): Engine to inspect, the application
+            engine by default.
+
+    Returns:
+        dict[str, int]: Pool size and checked out, idle, overflow and
+            waiting connections.
+    """
+    pool = (target or engine).pool
+    if not isinstance(pool, QueuePool):
+        return {"size": 0, "checked_out": 0, "idle": 0, "overflow": 0, "waiting": 0}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "waiting": getattr(pool, "waiting", 0),
+    }
+
+
+async def warm_up_pool(count: int, target: AsyncEngine | None = None) -> int:
+    """
+    Open pool connections ahead of the first requests.
+
+    The connections are checked out together, so ``count`` distinct
+    connections are opened, and returned to the pool idle.
+
+    Args:
+        count (int): Connections to open, at most the pool size.
+        target (AsyncEngine | None): Engine to warm up, the application
+            engine by default.
+
+    Returns:
+        int: Number of connections opened.
+    """
+    target = target or engine
+    size = pool_stats(target)["size"] or 1
+    connections = [target.connect() for _ in range(min(count, size))]
+    results = await asyncio.gather(
+        *(connection.start() for connection in connections), return_exceptions=True
+    )
+    for connection in connections:
+        if connection.sync_connection is not None:
+            await connection.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(connections)
+
+
+async def check_database(target: AsyncEngine | None = None) -> None:
+    """
+    Run a trivial query through the pool.
+
+    Args:
+        target (AsyncEngine | None): Engine to check, the application
+            engine by default.
+
+    Raises:
+        SQLAlchemyError: The database cannot be reached.
+    """
+    async with (target or engine).connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
 
 # Create an asynchronous SQLAlchemy engine using configuration values
-engine = create_async_engine(config.db.url, future=True, echo=config.debug)
+engine = create_engine()
 
 # Create an asynchronous session maker for managing DB sessions
 async_session = async_sessionmaker(engine, class_=AsyncSession)
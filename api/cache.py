@@ -0,0 +1,373 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Awaitable, Callable, Iterable
+
+from config import config
+from metrics import CACHE_REQUESTS
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from serializers import VARIANTS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+Loader = Callable[[], Awaitable[bytes]]
+
+
+def cache_key(city: str, day: date, variant: str = "json") -> str:
+    """
+    Build the cache key for the weather of a city on a given day.
+
+    Args:
+        city (str): City name.
+        day (date): Day of the cached readings.
+        variant (str): Response format of the cached payload.
+
+    Returns:
+        str: Redis key.
+    """
+    return f"{config.cache.prefix}:{city}:{day.isoformat()}:{variant}"
+
+
+def cache_ttl(day: date) -> int:
+    """
+    Choose how long a day's payload may be cached.
+
+    Past days no longer receive readings, so they are kept much longer
+    than the current day.
+    """
+    if day < date.today():
+        return config.cache.past_ttl
+    return config.cache.today_ttl
+
+
+def local_ttl(day: date) -> float:
+    """Choose how long a day's payload may stay in the in-process cache."""
+    if day < date.today():
+        return config.cache.local_past_ttl
+    return config.cache.local_today_ttl
+
+
+def cache_control(day: date) -> str:
+    """
+    Build the ``Cache-Control`` header of a day's weather response.
+
+    Past days may be stored by nginx and clients for
+    ``config.cache.http_past_max_age`` seconds. The current day must be
+    revalidated on every use, which is cheap with its ETag.
+    """
+    if day < date.today():
+        return f"public, max-age={config.cache.http_past_max_age}"
+    return "no-cache"
+
+
+def edge_ttl(day: date) -> int:
+    """
+    Choose how long nginx may serve a response about ``day`` from its cache.
+
+    Sent as ``X-Accel-Expires``, which nginx honours over ``Cache-Control``
+    and does not pass on to clients. The current day is only micro-cached
+    to absorb bursts of identical requests.
+    """
+    if day < date.today():
+        return config.cache.edge_past_ttl
+    return config.cache.edge_today_ttl
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with per-entry TTL.
+
+    Concurrent misses for the same key are coalesced: only the first caller
+    runs the loader, the others await its result. If that caller is
+    cancelled, the others load the value again instead of failing.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to run the loader.
+        coalesced (int): Misses that waited for a load already in flight.
+        evictions (int): Entries dropped to respect ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        tier: str = "local",
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of stored entries.
+            ttl (float): Default entry lifetime in seconds.
+            clock (Callable[[], float]): Monotonic time source.
+            tier (str): Name of the cache in the exported metrics.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.tier = tier
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        """Return a fresh entry and mark it as recently used, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Store an entry, evicting the least recently used ones when full."""
+        if ttl is None:
+            ttl = self.ttl
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Drop an entry if present."""
+        self._entries.pop(key, None)
+
+    async def get_or_load(
+        self, key: str, loader: Loader, ttl: float | None = None
+    ) -> bytes:
+        """
+        Return the entry for ``key``, running ``loader`` at most once per miss.
+
+        Args:
+            key (str): Cache key.
+            loader (Loader): Coroutine function producing the value.
+            ttl (float | None): Lifetime of the loaded entry.
+
+        Returns:
+            bytes: Cached or freshly loaded value.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            CACHE_REQUESTS.labels(self.tier, "hit").inc()
+            return value
+
+        self.misses += 1
+        while (inflight := self._inflight.get(key)) is not None:
+            self.coalesced += 1
+            CACHE_REQUESTS.labels(self.tier, "coalesced").inc()
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Only the caller running the load was cancelled, e.g. its
+                # client disconnected: retry with this caller's loader.
+                task = asyncio.current_task()
+                if not inflight.cancelled() or (task and task.cancelling()):
+                    raise
+                logger.debug("Load of %s was cancelled, loading again.", key)
+
+        CACHE_REQUESTS.labels(self.tier, "miss").inc()
+
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Waiters re-raise it; mark it retrieved for the no-waiter case.
+                future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        self.set(key, value, ttl)
+        future.set_result(value)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        """Return cache counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+class WeatherCache:
+    """
+    Two-tier read-through cache of serialized weather responses keyed by (city, day).
+
+    Lookups go to the in-process LRU first, then to Redis, then to the
+    loader. Redis errors never fail a request: the cache logs them and
+    falls back to the loader.
+    """
+
+    def __init__(self, client: Redis | None, local: LocalCache | None = None):
+        """
+        Initialize the cache.
+
+        Args:
+            client (Redis | None): Redis client, or None to disable the Redis tier.
+            local (LocalCache | None): In-process tier, or None to disable it.
+        """
+        self.client = client
+        self.local = local
+
+    async def get(self, city: str, day: date, variant: str = "json") -> bytes | None:
+        """
+        Return the cached payload for (city, day) without loading it on a miss.
+
+        Args:
+            city (str): City name.
+            day (date): Requested day.
+            variant (str): Response format of the payload.
+
+        Returns:
+            bytes | None: Serialized payload, or None if neither tier has it.
+        """
+        key = cache_key(city, day, variant)
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                CACHE_REQUESTS.labels(self.local.tier, "hit").inc()
+                return value
+        if self.client is None:
+            return None
+
+        try:
+            cached = await self.client.get(key)
+        except RedisError as e:
+            logger.warning("Cache read failed for %s: %s", key, e)
+            CACHE_REQUESTS.labels("redis", "error").inc()
+            return None
+        if cached is None:
+            return None
+        CACHE_REQUESTS.labels("redis", "hit").inc()
+        value = cached.encode() if isinstance(cached, str) else cached
+        if self.local is not None:
+            self.local.set(key, value, ttl=local_ttl(day))
+        return value
+
+    async def get_or_load(
+        self, city: str, day: date, loader: Loader, variant: str = "json"
+    ) -> bytes:
+        """
+        Return the cached payload for (city, day), loading it on a miss.
+
+        Args:
+            city (str): City name.
+            day (date): Requested day.
+            loader (Loader): Coroutine function producing the serialized payload.
+            variant (str): Response format of the payload.
+
+        Returns:
+            bytes: Serialized payload.
+        """
+        key = cache_key(city, day, variant)
+        if self.local is None:
+            return await self._get_or_load_shared(key, day, loader)
+
+        async def load_shared() -> bytes:
+            return await self._get_or_load_shared(key, day, loader)
+
+        return await self.local.get_or_load(key, load_shared, ttl=local_ttl(day))
+
+    async def _get_or_load_shared(self, key: str, day: date, loader: Loader) -> bytes:
+        """
+        Return the Redis payload under ``key``, loading and storing it on a miss.
+
+        Args:
+            key (str): Cache key.
+            day (date): Requested day, which determines the TTL.
+            loader (Loader): Coroutine function producing the serialized payload.
+
+        Returns:
+            bytes: Serialized payload.
+        """
+        if self.client is None:
+            return await loader()
+
+        try:
+            cached = await self.client.get(key)
+        except RedisError as e:
+            logger.warning("Cache read failed for %s: %s", key, e)
+            CACHE_REQUESTS.labels("redis", "error").inc()
+            return await loader()
+
+        if cached is not None:
+            logger.debug("Cache hit for %s", key)
+            CACHE_REQUESTS.labels("redis", "hit").inc()
+            return cached.encode() if isinstance(cached, str) else cached
+
+        logger.debug("Cache miss for %s", key)
+        CACHE_REQUESTS.labels("redis", "miss").inc()
+        payload = await loader()
+        try:
+            await self.client.set(key, payload, ex=cache_ttl(day))
+        except RedisError as e:
+            logger.warning("Cache write failed for %s: %s", key, e)
+        return payload
+
+    async def invalidate(self, entries: Iterable[tuple[str, date]]) -> None:
+        """
+        Drop cached payloads for the given (city, day) pairs.
+
+        Args:
+            entries (Iterable[tuple[str, date]]): Pairs whose data changed.
+        """
+        keys = {
+            cache_key(city, day, variant)
+            for city, day in entries
+            for variant in VARIANTS
+        }
+        if self.local is not None:
+            for key in keys:
+                self.local.delete(key)
+        if self.client is None or not keys:
+            return
+
+        try:
+            await self.client.delete(*keys)
+            logger.info("Invalidated %d cache keys.", len(keys))
+        except RedisError as e:
+            logger.warning("Cache invalidation failed: %s", e)
+
+    async def close(self) -> None:
+        """Close the underlying Redis connection pool."""
+        if self.client is not None:
+            await self.client.aclose()
+
+
+def create_cache() -> WeatherCache:
+    """Create a weather cache with the tiers enabled in the configuration."""
+    local = None
+    if config.cache.local_max_entries > 0:
+        local = LocalCache(config.cache.local_max_entries, config.cache.local_today_ttl)
+    if not config.cache.enabled:
+        return WeatherCache(None, local)
+    return WeatherCache(Redis.from_url(config.redis.url), local)
+
+
+weather_cache = create_cache()
@@ -1,22 +1,61 @@
 import logging
-from logging.handlers import RotatingFileHandler
-from pathlib import Path
+import socket
+from functools import partial
 
-from pydantic_settings import BaseSettings
+from logs import ProcessQueueHandler, SampleFilter, create_target
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-Path("log").mkdir(parents=True, exist_ok=True)
-# Налаштування логування
-log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s")
 
-# Ротація логів
-log_handler = logging.handlers.RotatingFileHandler(
-    "log/app.log", maxBytes=10**6, backupCount=3
-)
+class LogConfig(BaseSettings):
+    """Logging configuration."""
+
+    level: str = "INFO"
+    output: str = "file"
+    directory: str = "log"
+    json_format: bool = True
+    max_bytes: int = 10**6
+    backup_count: int = 3
+    debug_sample_rate: float = 1.0
+
+    model_config = SettingsConfigDict(env_prefix="LOG_")
+
+    @field_validator("level")
+    @classmethod
+    def check_level(cls, level: str) -> str:
+        """Accept level names in any case, e.g. ``debug``."""
+        if level.upper() not in logging.getLevelNamesMapping():
+            raise ValueError(f"unknown log level {level!r}")
+        return level.upper()
+
+    @property
+    def levelno(self) -> int:
+        """
+        Numeric value of ``level``, which every module logger is set to.
 
-log_handler.setFormatter(log_formatter)
+        Returns:
+            int: Logging level, e.g. ``logging.DEBUG``.
+        """
+        return logging.getLevelNamesMapping()[self.level]
+
+
+# Records are queued by the logging call, then formatted and written by a
+# listener thread of each process, one file (or stdout) per process.
+log_config = LogConfig()
+log_handler = ProcessQueueHandler(
+    partial(
+        create_target,
+        log_config.output,
+        log_config.directory,
+        log_config.json_format,
+        log_config.max_bytes,
+        log_config.backup_count,
+    )
+)
+log_handler.addFilter(SampleFilter(log_config.debug_sample_rate))
 
 
-class DBConfig:
+class DBConfig(BaseSettings):
     """Database configuration."""
 
     host: str = "db"
@@ -24,11 +63,20 @@ class DBConfig:
     user: str = "postgres"
     password: str = "postgres"
     name: str = "postgres"
-
-    class Config:
-        """Configuration for database settings."""
-
-        env_prefix = "DB_"
+    partitioned: bool = False
+    partition_months_ahead: int = 1
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 30 * 60
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100
+    pgbouncer: bool = False
+    slow_checkout: float = 1.0
+    warmup_connections: int = 5
+    readiness_timeout: float = 2.0
+
+    model_config = SettingsConfigDict(env_prefix="DB_")
 
     @property
     def url(self) -> str:
@@ -44,7 +92,7 @@ class DBConfig:
         )
 
 
-class RedisConfig:
+class RedisConfig(BaseSettings):
     """REDIS configuration."""
 
     host: str = "redis"
@@ -52,38 +100,139 @@ class RedisConfig:
     password: str = "1111"
     db: int = 0
 
-    class Config:
-        """Configuration for API settings."""
-
-        env_prefix = "REDIS_"
+    model_config = SettingsConfigDict(env_prefix="REDIS_")
 
     @property
     def url(self) -> str:
         return f"redis://:{self.password}@{self.host}:{self.port}/{self.db}"
 
 
-class APIConfig:
-    """API configuration."""
+class CacheConfig(BaseSettings):
+    """Response cache configuration."""
+
+    enabled: bool = True
+    prefix: str = "weather"
+    today_ttl: int = 20
+    past_ttl: int = 7 * 24 * 60 * 60
+    local_max_entries: int = 1024
+    local_today_ttl: float = 5.0
+    local_past_ttl: float = 5 * 60.0
+    http_past_max_age: int = 60 * 60
+    edge_today_ttl: int = 5
+    edge_past_ttl: int = 5 * 60
+
+    model_config = SettingsConfigDict(env_prefix="CACHE_")
+
+
+class RetentionConfig(BaseSettings):
+    """Raw weather data retention configuration."""
+
+    raw_days: int = 90
+    batch_size: int = 5000
+
+    model_config = SettingsConfigDict(env_prefix="RETENTION_")
+
+
+class IngestConfig(BaseSettings):
+    """Write-behind ingestion configuration."""
+
+    write_behind: bool = False
+    stream: str = "weather:readings"
+    group: str = "flusher"
+    consumer: str = socket.gethostname()
+    batch_size: int = 5000
+    block_ms: int = 1000
+    claim_idle_ms: int = 60_000
+    backlog_warning: int = 100_000
+    report_interval: float = 15.0
 
-    city: str
+    model_config = SettingsConfigDict(env_prefix="INGEST_")
 
-    class Config:
-        """Configuration for API settings."""
 
-        env_prefix = "API_"
+class LiveConfig(BaseSettings):
+    """Live update (SSE/WebSocket) configuration."""
 
+    prefix: str = "live"
+    max_subscribers: int = 10_000
+    max_cities: int = 50
+    coalesce: float = 0.5
+    heartbeat: float = 15.0
+
+    model_config = SettingsConfigDict(env_prefix="LIVE_")
+
+
+class AuthConfig(BaseSettings):
+    """API key authentication configuration."""
+
+    backend: str = "pattern"
+    prefix: str = "auth"
+    cache_ttl: float = 60.0
+    negative_ttl: float = 10.0
+    cache_max_entries: int = 10_000
+    rate_limit: float = 0.0
+    burst: int = 20
+    lease: int = 5
+
+    model_config = SettingsConfigDict(env_prefix="AUTH_")
+
+
+class MetricsConfig(BaseSettings):
+    """Prometheus metrics configuration."""
+
+    worker_port: int = 9540
+    flusher_port: int = 9541
+
+    model_config = SettingsConfigDict(env_prefix="METRICS_")
+
+
+class ServerConfig(BaseSettings):
+    """Gunicorn and uvicorn server configuration."""
+
+    bind: str = "0.0.0.0:8000"
+    workers: int = 0
+    workers_per_cpu: float = 1.0
+    max_workers: int = 16
+    loop: str = "uvloop"
+    http: str = "httptools"
+    backlog: int = 2048
+    keepalive: int = 75
+    timeout: int = 30
+    graceful_timeout: int = 30
+    max_requests: int = 10_000
+    max_requests_jitter: int = 1_000
+    preload: bool = True
+    forwarded_allow_ips: str = "*"
+
+    model_config = SettingsConfigDict(env_prefix="SERVER_")
+
+
+class APIConfig(BaseSettings):
+    """API configuration."""
 
-class ExternalAPIConfig:
-    path: str = "http://api.weatherapi.com/v1/current.json?key={0}&q={1}"
     city: str = "Kyiv"
+
+    model_config = SettingsConfigDict(env_prefix="API_")
+
+
+class ExternalAPIConfig(BaseSettings):
+    path: str = "https://api.weatherapi.com/v1/current.json?key={0}&q={1}"
+    city: str = "Kyiv"
+    cities: tuple[str, ...] = ("Kyiv",)
     key: str = "00751112dd4b4c1ba24121534250805"
+    timeout: float = 5.0
+    connect_timeout: float = 2.0
+    concurrency: int = 20
+    rate_limit: float = 10.0
+    retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 5.0
+    breaker_threshold: int = 5
+    breaker_reset: float = 60.0
+    http2: bool = False
 
     """External API configuration."""
 
-    class Config:
-        """Configuration for API settings."""
-
-        env_prefix = "EXTAPI_"
+    model_config = SettingsConfigDict(env_prefix="EXTAPI_")
 
     def url(self, city: str | None = None) -> str:
         if city is None:
@@ -95,13 +244,21 @@ class Settings(BaseSettings):
     """Basic application settings."""
 
     debug: bool = False
-    db: DBConfig = DBConfig()
-    api: APIConfig = APIConfig()
-    redis: RedisConfig = RedisConfig()
-    extapi: ExternalAPIConfig = ExternalAPIConfig()
-    log_handler: RotatingFileHandler = log_handler
-
-    loglevel: int = logging.INFO
+    db: DBConfig = Field(default_factory=DBConfig)
+    api: APIConfig = Field(default_factory=APIConfig)
+    server: ServerConfig = Field(default_factory=ServerConfig)
+    redis: RedisConfig = Field(default_factory=RedisConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    retention: RetentionConfig = Field(default_factory=RetentionConfig)
+    ingest: IngestConfig = Field(default_factory=IngestConfig)
+    live: LiveConfig = Field(default_factory=LiveConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    auth: AuthConfig = Field(default_factory=AuthConfig)
+    extapi: ExternalAPIConfig = Field(default_factory=ExternalAPIConfig)
+    log: LogConfig = log_config
+    log_handler: ProcessQueueHandler = log_handler
+
+    loglevel: int = log_config.levelno
 
 
 config = Settings()
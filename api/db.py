@@ -1,11 +1,41 @@
+import itertools
 import logging
-from datetime import date, datetime, time
+import math
+from datetime import date, datetime, time, timedelta
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    NamedTuple,
+    Sequence,
+)
 
-from base import Base, engine
 from config import config
+from metrics import observe_query
+from models.rollup_model import WeatherDaily, WeatherHourly, WeatherRollup
 from models.weather_model import Weather
-from schema.wether_schema import WetherSchema
-from sqlalchemy import and_, select
+from partitions import ensure_partitions, ensured_partitions, month_start
+from schema.wether_schema import WeatherSeriesSchema, WetherSchema
+from sqlalchemy import (
+    ColumnElement,
+    Float,
+    Interval,
+    Row,
+    Select,
+    String,
+    and_,
+    any_,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -13,13 +43,232 @@ logger.setLevel(config.loglevel)
 logger.addHandler(config.log_handler)
 
 
+class WeatherReading(NamedTuple):
+    """A single temperature measurement ready to be written to the database."""
+
+    city: str
+    temperature: float
+    time_point: datetime
+
+
+READING_COLUMNS = WeatherReading._fields
+
+# Columns of weather rows returned without building ORM objects.
+WEATHER_COLUMNS = (Weather.temperature, Weather.city, Weather.time_point, Weather.id)
+
+
+async def _chunked(
+    readings: Iterable[WeatherReading] | AsyncIterable[WeatherReading], size: int
+) -> AsyncIterator[list[WeatherReading]]:
+    """Group readings from a sync or async source into lists of ``size``."""
+    chunk: list[WeatherReading] = []
+    if isinstance(readings, AsyncIterable):
+        async for reading in readings:
+            chunk.append(reading)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    else:
+        for reading in readings:
+            chunk.append(reading)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+# Supported aggregation bucket sizes, in seconds.
+BUCKET_SECONDS = {"5m": 5 * 60, "1h": 60 * 60, "1d": 24 * 60 * 60}
+
+# Buckets are aligned to this origin, i.e. to midnight.
+BUCKET_ORIGIN = datetime(2000, 1, 1)
+
+
+# Rollup tables with their bucket width, coarsest first.
+ROLLUPS: tuple[tuple[int, type[WeatherRollup]], ...] = (
+    (BUCKET_SECONDS["1d"], WeatherDaily),
+    (BUCKET_SECONDS["1h"], WeatherHourly),
+)
+
+
+def bucket_start(time_point: datetime, seconds: int) -> datetime:
+    """Return the start of the ``seconds``-wide bucket containing ``time_point``."""
+    offset = (time_point - BUCKET_ORIGIN) // timedelta(seconds=seconds)
+    return BUCKET_ORIGIN + timedelta(seconds=offset * seconds)
+
+
+def percentile_cont(values: Sequence[float], fraction: float) -> float:
+    """
+    Compute a percentile with linear interpolation, like SQL ``percentile_cont``.
+
+    Args:
+        values (Sequence[float]): Sorted, non-empty values.
+        fraction (float): Percentile as a fraction between 0 and 1.
+    """
+    position = fraction * (len(values) - 1)
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def percentile_label(fraction: float) -> str:
+    """Name a percentile column, e.g. 0.95 -> ``p95``."""
+    return f"p{fraction * 100:g}"
+
+
+def summarize_readings(
+    readings: Iterable[WeatherReading], seconds: int
+) -> list[dict[str, Any]]:
+    """
+    Fold readings into rollup rows, one per (city, bucket).
+
+    Args:
+        readings (Iterable[WeatherReading]): Readings to summarize.
+        seconds (int): Bucket width in seconds.
+
+    Returns:
+        list[dict[str, Any]]: Rollup rows sorted by (city, bucket).
+    """
+    rows: dict[tuple[str, datetime], dict[str, Any]] = {}
+    for reading in readings:
+        key = (reading.city, bucket_start(reading.time_point, seconds))
+        row = rows.get(key)
+        if row is None:
+            rows[key] = {
+                "city": reading.city,
+                "bucket": key[1],
+                "count": 1,
+                "sum_temperature": reading.temperature,
+                "min_temperature": reading.temperature,
+                "max_temperature": reading.temperature,
+                "last_temperature": reading.temperature,
+                "last_time_point": reading.time_point,
+            }
+            continue
+        row["count"] += 1
+        row["sum_temperature"] += reading.temperature
+        row["min_temperature"] = min(row["min_temperature"], reading.temperature)
+        row["max_temperature"] = max(row["max_temperature"], reading.temperature)
+        if reading.time_point >= row["last_time_point"]:
+            row["last_temperature"] = reading.temperature
+            row["last_time_point"] = reading.time_point
+    return [rows[key] for key in sorted(rows)]
+
+
+# Rollup rows per upsert statement: 8 bound parameters per row must stay
+# below the 32767 parameters asyncpg accepts in one statement.
+ROLLUP_BATCH = 2000
+
+
+def rollup_upsert(
+    model: type[WeatherRollup], rows: list[dict[str, Any]], dialect_name: str
+) -> Any:
+    """
+    Build an upsert merging rollup rows into the existing buckets.
+
+    Args:
+        model (type[WeatherRollup]): Rollup table to update.
+        rows (list[dict[str, Any]]): Rows with unique (city, bucket) keys.
+        dialect_name (str): ``postgresql`` or ``sqlite``.
+
+    Returns:
+        Insert: ``INSERT ... ON CONFLICT (city, bucket) DO UPDATE`` statement.
+    """
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(model).values(rows)
+    new = statement.excluded
+    newer = new.last_time_point >= model.last_time_point
+    return statement.on_conflict_do_update(
+        index_elements=[model.city, model.bucket],
+        set_={
+            "count": model.count + new.count,
+            "sum_temperature": model.sum_temperature + new.sum_temperature,
+            "min_temperature": case(
+                (new.min_temperature < model.min_temperature, new.min_temperature),
+                else_=model.min_temperature,
+            ),
+            "max_temperature": case(
+                (new.max_temperature > model.max_temperature, new.max_temperature),
+                else_=model.max_temperature,
+            ),
+            "last_temperature": case(
+                (newer, new.last_temperature), else_=model.last_temperature
+            ),
+            "last_time_point": case(
+                (newer, new.last_time_point), else_=model.last_time_point
+            ),
+        },
+    )
+
+
+def pick_rollup(
+    bucket_seconds: int, start: datetime, end: datetime
+) -> tuple[int, type[WeatherRollup]] | None:
+    """
+    Choose the coarsest rollup that can answer an aggregate query exactly.
+
+    A rollup qualifies when the requested bucket is a multiple of its width
+    and both range bounds fall on its bucket boundaries.
+
+    Returns:
+        tuple | None: Bucket width and rollup table, or None to use raw data.
+    """
+    for seconds, model in ROLLUPS:
+        if (
+            bucket_seconds % seconds == 0
+            and bucket_start(start, seconds) == start
+            and bucket_start(end, seconds) == end
+        ):
+            return seconds, model
+    return None
+
+
+def city_filter(cities: Sequence[str], dialect_name: str) -> ColumnElement[bool]:
+    """
+    Match readings of any of ``cities``.
+
+    On PostgreSQL the list is bound as a single array, ``city = ANY($1)``,
+    so the statement (and its prepared form) is the same for any number
+    of cities; other dialects get ``city IN (...)``.
+
+    Args:
+        cities (Sequence[str]): City names.
+        dialect_name (str): Name of the database dialect.
+
+    Returns:
+        ColumnElement[bool]: Filter on ``Weather.city``.
+    """
+    if dialect_name == "postgresql":
+        array = bindparam("cities", list(cities), type_=postgresql.ARRAY(String))
+        return Weather.city == any_(array)
+    return Weather.city.in_(cities)
+
+
 class DB:
     """
     Database access layer for weather-related operations.
 
     Methods:
         set_weather(city, temperature, time): Saves a new weather record.
+        set_weather_many(readings): Saves a batch of weather records.
+        store_new_weather(readings): Saves the readings not stored yet and
+            returns them.
         get_weather(city, day): Retrieves weather data for a given city and day.
+        get_weather_rows(city, day): Retrieves the same data as plain rows.
+        get_weather_version(city, day): Returns the newest time point and
+            the count of a city's readings on a day.
+        get_weather_batch(cities, start, end): Retrieves a date range of
+            several cities in one query.
+        get_weather_page(city, start, end, limit, after): Retrieves one page
+            of a date range using keyset pagination.
+        stream_weather(city, start, end): Streams a date range row by row.
+        aggregate_weather(cities, start, end, bucket_seconds, percentiles):
+            Computes per-bucket statistics, from rollups when possible.
+        update_rollups(readings): Merges readings into the rollup tables.
+        rebuild_rollups(start, end): Recomputes rollups from raw readings.
+        oldest_time_point(): Returns the timestamp of the oldest raw reading.
+        delete_duplicates(): Deletes repeated readings of a city and time.
     """
 
     def __init__(self, session: AsyncSession):
@@ -30,13 +279,14 @@ class DB:
             session (AsyncSession): Async database session.
         """
         self.db_session = session
-        logger.info("Database session initialized.")
+        logger.debug("Database session initialized.")
 
+    @observe_query("set_weather", rows=lambda weather_id: 1)
     async def set_weather(
         self,
         city: str,
         temperature: float,
-        time_point: datetime = datetime.now(tz=None),
+        time_point: datetime | None = None,
     ) -> int | None:
         """
         Store weather data in the database.
@@ -49,6 +299,8 @@ class DB:
         Returns:
             int: ID of the newly created record.
         """
+        if time_point is None:
+            time_point = datetime.now()
         logger.info(
             "Saving weather data: city=%s, temperature=%s, time_point=%s",
             city,
@@ -57,12 +309,246 @@ class DB:
         )
 
         weather = Weather(city=city, temperature=temperature, time_point=time_point)
+        month = month_start(time_point)
+        if month not in ensured_partitions:
+            await ensure_partitions(await self.db_session.connection(), [month])
         self.db_session.add(weather)
+        await self.update_rollups([WeatherReading(city, temperature, time_point)])
         await self.db_session.commit()
+        ensured_partitions.add(month)
         await self.db_session.refresh(weather)
         logger.info("Weather data saved with ID: %s", weather.id)
         return int(weather.id)
 
+    @observe_query("set_weather_many", rows=int)
+    async def set_weather_many(
+        self,
+        readings: Iterable[WeatherReading] | AsyncIterable[WeatherReading],
+        chunk_size: int = 1000,
+        skip_duplicates: bool = False,
+    ) -> int:
+        """
+        Store a stream of weather readings in chunks within one transaction.
+
+        On PostgreSQL with asyncpg every chunk is sent with ``COPY ... FROM
+        STDIN``; other dialects get one multi-row ``INSERT`` per chunk. Only
+        one chunk is held in memory at a time. The rollup tables are updated
+        in the same transaction.
+
+        With ``skip_duplicates`` every chunk is sent as ``INSERT ... ON
+        CONFLICT (city, time_point) DO NOTHING`` instead, so readings that
+        are already stored are skipped rather than failing the batch, and
+        only the inserted ones are added to the rollups. This makes storing
+        the same observations again (e.g. on a task retry) a no-op.
+
+        Args:
+            readings (Iterable | AsyncIterable): Readings to store.
+            chunk_size (int): Number of readings sent per round-trip.
+            skip_duplicates (bool): Skip readings whose city and time are
+                already stored.
+
+        Returns:
+            int: Number of stored records.
+        """
+        stored = 0
+        async for chunk in self._store_chunks(readings, chunk_size, skip_duplicates):
+            stored += len(chunk)
+        return stored
+
+    @observe_query("store_new_weather")
+    async def store_new_weather(
+        self, readings: Iterable[WeatherReading], chunk_size: int = 1000
+    ) -> list[WeatherReading]:
+        """
+        Store readings, skipping those already stored, and return the new ones.
+
+        Ingestion announces only the returned readings, so storing the same
+        observations again (a task retry, a redelivered batch) announces
+        nothing.
+
+        Args:
+            readings (Iterable[WeatherReading]): Readings to store.
+            chunk_size (int): Number of readings sent per round-trip.
+
+        Returns:
+            list[WeatherReading]: Readings actually inserted.
+        """
+        inserted: list[WeatherReading] = []
+        async for chunk in self._store_chunks(readings, chunk_size, True):
+            inserted.extend(chunk)
+        return inserted
+
+    async def _store_chunks(
+        self,
+        readings: Iterable[WeatherReading] | AsyncIterable[WeatherReading],
+        chunk_size: int,
+        skip_duplicates: bool,
+    ) -> AsyncIterator[list[WeatherReading]]:
+        """
+        Store readings chunk by chunk and commit once all are stored.
+
+        See ``set_weather_many`` for the insert strategies.
+
+        Yields:
+            list[WeatherReading]: Readings stored from each chunk.
+        """
+        connection = await self.db_session.connection()
+        use_copy = connection.dialect.driver == "asyncpg" and not skip_duplicates
+        stored = 0
+        created_partitions: set[date] = set()
+
+        async for chunk in _chunked(readings, chunk_size):
+            months = {month_start(r.time_point) for r in chunk} - ensured_partitions
+            if months - created_partitions:
+                await ensure_partitions(connection, months - created_partitions)
+                created_partitions |= months
+            if use_copy:
+                raw_connection = await connection.get_raw_connection()
+                driver_connection: Any = raw_connection.driver_connection
+                await driver_connection.copy_records_to_table(
+                    Weather.__tablename__, records=chunk, columns=READING_COLUMNS
+                )
+            elif skip_duplicates:
+                chunk = await self._insert_new(chunk, connection.dialect.name)
+            else:
+                values = [reading._asdict() for reading in chunk]
+                await self.db_session.execute(insert(Weather).values(values))
+            await self.update_rollups(chunk)
+            stored += len(chunk)
+            logger.info("Saved chunk of %d weather records.", len(chunk))
+            yield chunk
+
+        await self.db_session.commit()
+        ensured_partitions.update(created_partitions)
+        logger.info("Weather batch saved: %d records.", stored)
+
+    async def _insert_new(
+        self, chunk: list[WeatherReading], dialect_name: str
+    ) -> list[WeatherReading]:
+        """
+        Insert the readings of a chunk that are not stored yet.
+
+        Args:
+            chunk (list[WeatherReading]): Readings to insert.
+            dialect_name (str): ``postgresql`` or ``sqlite``.
+
+        Returns:
+            list[WeatherReading]: Readings actually inserted.
+        """
+        dialect = postgresql if dialect_name == "postgresql" else sqlite
+        statement = (
+            dialect.insert(Weather)
+            .values([reading._asdict() for reading in chunk])
+            .on_conflict_do_nothing(index_elements=[Weather.city, Weather.time_point])
+            .returning(Weather.city, Weather.temperature, Weather.time_point)
+        )
+        result = await self.db_session.execute(statement)
+        inserted = [WeatherReading(*row) for row in result]
+        if len(inserted) < len(chunk):
+            logger.debug(
+                "Skipped %d already stored readings.", len(chunk) - len(inserted)
+            )
+        return inserted
+
+    async def update_rollups(self, readings: Sequence[WeatherReading]) -> None:
+        """
+        Merge readings into every rollup table without committing.
+
+        Args:
+            readings (Sequence[WeatherReading]): Readings just written.
+        """
+        if not readings:
+            return
+        dialect_name = (await self.db_session.connection()).dialect.name
+        for seconds, model in ROLLUPS:
+            rows = summarize_readings(readings, seconds)
+            for offset in range(0, len(rows), ROLLUP_BATCH):
+                batch = rows[offset : offset + ROLLUP_BATCH]
+                await self.db_session.execute(rollup_upsert(model, batch, dialect_name))
+
+    async def rebuild_rollups(
+        self, start: datetime, end: datetime, chunk_size: int = 10_000
+    ) -> int:
+        """
+        Recompute the rollup tables from raw readings within ``[start, end)``.
+
+        The range is widened to whole days so no bucket is rebuilt from a
+        partial set of readings. It never starts before the day of the
+        oldest raw reading: older rollups outlive the readings deleted by
+        retention and could not be rebuilt.
+
+        Args:
+            start (datetime): Start of the range to rebuild.
+            end (datetime): End of the range to rebuild.
+            chunk_size (int): Number of raw readings folded per round-trip.
+
+        Returns:
+            int: Number of raw readings folded into the rollups.
+        """
+        day = BUCKET_SECONDS["1d"]
+        start = bucket_start(start, day)
+        if bucket_start(end, day) != end:
+            end = bucket_start(end, day) + timedelta(seconds=day)
+        oldest = await self.oldest_time_point()
+        if oldest is None:
+            logger.warning("No raw readings, keeping the weather rollups.")
+            return 0
+        if start < bucket_start(oldest, day):
+            start = bucket_start(oldest, day)
+            logger.warning("Keeping the weather rollups before %s.", start)
+        if start >= end:
+            return 0
+        logger.info("Rebuilding weather rollups for [%s, %s)", start, end)
+
+        for _, model in ROLLUPS:
+            await self.db_session.execute(
+                delete(model).where(and_(model.bucket >= start, model.bucket < end))
+            )
+
+        command = (
+            select(Weather.city, Weather.temperature, Weather.time_point)
+            .where(and_(Weather.time_point >= start, Weather.time_point < end))
+            .execution_options(yield_per=chunk_size)
+        )
+        folded = 0
+        result = await self.db_session.stream(command)
+        async for partition in result.partitions():
+            chunk = [WeatherReading(*row) for row in partition]
+            await self.update_rollups(chunk)
+            folded += len(chunk)
+            logger.info("Folded %d readings into rollups.", folded)
+
+        await self.db_session.commit()
+        logger.info("Weather rollups rebuilt from %d readings.", folded)
+        return folded
+
+    async def oldest_time_point(self) -> datetime | None:
+        """Return the timestamp of the oldest raw reading, if any."""
+        result = await self.db_session.execute(select(func.min(Weather.time_point)))
+        oldest: datetime | None = result.scalar()
+        return oldest
+
+    async def delete_duplicates(self) -> int:
+        """
+        Delete repeated readings, keeping the first of every city and time.
+
+        Needed once for data stored before readings were unique per
+        (city, time_point); the rollups still count the deleted rows until
+        they are rebuilt.
+
+        Returns:
+            int: Number of deleted rows.
+        """
+        first = select(func.min(Weather.id)).group_by(Weather.city, Weather.time_point)
+        result = await self.db_session.execute(
+            delete(Weather).where(Weather.id.not_in(first))
+        )
+        await self.db_session.commit()
+        deleted: int = result.rowcount
+        logger.info("Deleted %d duplicate raw readings.", deleted)
+        return deleted
+
+    @observe_query("get_weather")
     async def get_weather(
         self, city: str, day: date = date.today()
     ) -> list[WetherSchema]:
@@ -78,7 +564,7 @@ class DB:
         """
         start = datetime.combine(day, time.min)
         end = datetime.combine(day, time.max)
-        logger.info("Retrieving weather for city=%s on day=%s", city, day)
+        logger.debug("Retrieving weather for city=%s on day=%s", city, day)
 
         command = (
             select(Weather)
@@ -89,13 +575,396 @@ class DB:
         result = await self.db_session.execute(command)
         records = list(result.scalars().all())
         weather_list = [WetherSchema.model_validate(i) for i in records]
-        logger.info("Retrieved %d weather records.", len(records))
+        logger.debug("Retrieved %d weather records.", len(records))
         return weather_list
 
+    @observe_query("get_weather_rows")
+    async def get_weather_rows(self, city: str, day: date) -> Sequence[Row[Any]]:
+        """
+        Retrieve the columns of a city's weather records for a specific day.
+
+        Unlike ``get_weather`` no ORM objects or schemas are built, so the
+        rows can be serialized directly.
+
+        Args:
+            city (str): City name to filter records.
+            day (date): Day for which data is requested.
+
+        Returns:
+            Sequence[Row]: Rows of ``temperature, city, time_point, id``
+                ordered by time descending.
+        """
+        start = datetime.combine(day, time.min)
+        logger.debug("Retrieving weather rows for city=%s on day=%s", city, day)
+        command = self._range_query(
+            city, start, start + timedelta(days=1), *WEATHER_COLUMNS
+        )
+        result = await self.db_session.execute(command)
+        rows = result.all()
+        logger.debug("Retrieved %d weather rows.", len(rows))
+        return rows
+
+    @observe_query("get_weather_version", rows=lambda version: version[1])
+    async def get_weather_version(
+        self, city: str, day: date
+    ) -> tuple[datetime | None, int]:
+        """
+        Summarize a city's readings of a day to detect changes cheaply.
+
+        Both values come from ``ix_weather_city_time_point`` without reading
+        the rows themselves. Gives the same result as ``rows_version`` over
+        ``get_weather_rows``.
+
+        Args:
+            city (str): City name.
+            day (date): Day of the readings.
+
+        Returns:
+            tuple[datetime | None, int]: Newest time point (None without
+                readings) and number of readings.
+        """
+        start = datetime.combine(day, time.min)
+        command = select(func.max(Weather.time_point), func.count()).where(
+            and_(
+                Weather.city == city,
+                Weather.time_point >= start,
+                Weather.time_point < start + timedelta(days=1),
+            )
+        )
+        newest, count = (await self.db_session.execute(command)).one()
+        return newest, int(count)
+
+    @observe_query("get_weather_batch", rows=len)
+    async def get_weather_batch(
+        self, cities: Sequence[str], start: datetime, end: datetime
+    ) -> Sequence[Row[Any]]:
+        """
+        Retrieve the weather rows of several cities within ``[start, end)``.
+
+        All cities are read by one query, ordered so the rows of every city
+        are contiguous.
+
+        Args:
+            cities (Sequence[str]): City names.
+            start (datetime): Inclusive lower bound.
+            end (datetime): Exclusive upper bound.
+
+        Returns:
+            Sequence[Row]: Rows of ``temperature, city, time_point, id``
+                ordered by city, then by time descending.
+        """
+        logger.debug(
+            "Retrieving weather rows for cities=%s in [%s, %s)", cities, start, end
+        )
+        dialect_name = (await self.db_session.connection()).dialect.name
+        command = (
+            select(*WEATHER_COLUMNS)
+            .where(
+                and_(
+                    city_filter(cities, dialect_name),
+                    Weather.time_point >= start,
+                    Weather.time_point < end,
+                )
+            )
+            .order_by(Weather.city, Weather.time_point.desc(), Weather.id.desc())
+        )
+        result = await self.db_session.execute(command)
+        rows = result.all()
+        logger.debug("Retrieved %d weather rows.", len(rows))
+        return rows
+
+    @staticmethod
+    def _range_query(
+        city: str, start: datetime, end: datetime, *columns: Any
+    ) -> Select[Any]:
+        """Build the query for a city's readings in ``[start, end)``, newest first."""
+        return (
+            select(*(columns or (Weather,)))
+            .where(
+                and_(
+                    Weather.city == city,
+                    Weather.time_point >= start,
+                    Weather.time_point < end,
+                )
+            )
+            .order_by(Weather.time_point.desc(), Weather.id.desc())
+        )
+
+    @observe_query("get_weather_page", rows=lambda page: len(page[0]))
+    async def get_weather_page(
+        self,
+        city: str,
+        start: datetime,
+        end: datetime,
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+    ) -> tuple[list[WetherSchema], tuple[datetime, int] | None]:
+        """
+        Retrieve one page of weather records for a city within ``[start, end)``.
+
+        Pages are ordered by ``(time_point, id)`` descending and continue
+        strictly after the ``after`` key, so deep pages cost the same as the
+        first one.
+
+        Args:
+            city (str): City name to filter records.
+            start (datetime): Inclusive lower bound.
+            end (datetime): Exclusive upper bound.
+            limit (int): Maximum number of records in the page.
+            after (tuple[datetime, int] | None): Key of the last record of the
+                previous page.
+
+        Returns:
+            tuple: Records of the page and the key to continue after, or None
+                when this is the last page.
+        """
+        logger.debug(
+            "Retrieving weather page for city=%s in [%s, %s) after %s",
+            city,
+            start,
+            end,
+            after,
+        )
+        command = self._range_query(city, start, end).limit(limit + 1)
+        if after is not None:
+            command = command.where(
+                tuple_(Weather.time_point, Weather.id)
+                < tuple_(literal(after[0]), literal(after[1]))
+            )
+
+        result = await self.db_session.execute(command)
+        records = list(result.scalars().all())
+        next_key = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_key = (records[-1].time_point, records[-1].id)
+        logger.debug("Retrieved %d weather records.", len(records))
+        return [WetherSchema.model_validate(i) for i in records], next_key
+
+    async def stream_weather(
+        self, city: str, start: datetime, end: datetime, batch_size: int = 1000
+    ) -> AsyncIterator[Row[Any]]:
+        """
+        Stream weather rows for a city within ``[start, end)``, newest first.
+
+        Rows are fetched from a server-side cursor ``batch_size`` at a time,
+        so memory use does not depend on the size of the range.
+
+        Args:
+            city (str): City name to filter records.
+            start (datetime): Inclusive lower bound.
+            end (datetime): Exclusive upper bound.
+            batch_size (int): Number of rows fetched per round-trip.
+
+        Yields:
+            Row: Rows of ``temperature, city, time_point, id``.
+        """
+        logger.debug("Streaming weather for city=%s in [%s, %s)", city, start, end)
+        command = self._range_query(
+            city, start, end, *WEATHER_COLUMNS
+        ).execution_options(yield_per=batch_size)
+        result = await self.db_session.stream(command)
+        async for row in result:
+            yield row
+
+    @observe_query(
+        "aggregate_weather",
+        rows=lambda series: sum(len(s.time) for s in series.values()),
+    )
+    async def aggregate_weather(
+        self,
+        cities: Sequence[str],
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+        percentiles: Sequence[float] = (),
+    ) -> dict[str, WeatherSeriesSchema]:
+        """
+        Compute per-bucket temperature statistics for cities within ``[start, end)``.
+
+        Queries without percentiles are answered from the coarsest rollup
+        table aligned with the bucket and range. Otherwise, on PostgreSQL the
+        aggregation runs in SQL with ``date_bin`` and ``percentile_cont``;
+        other dialects stream the rows and aggregate them in Python one
+        bucket at a time.
+
+        Args:
+            cities (Sequence[str]): Cities to aggregate.
+            start (datetime): Inclusive lower bound.
+            end (datetime): Exclusive upper bound.
+            bucket_seconds (int): Bucket width in seconds.
+            percentiles (Sequence[float]): Percentiles to compute, as fractions.
+
+        Returns:
+            dict[str, WeatherSeriesSchema]: Columnar series for every requested
+                city, ordered by bucket.
+        """
+        logger.debug(
+            "Aggregating weather for cities=%s in [%s, %s) by %ss",
+            cities,
+            start,
+            end,
+            bucket_seconds,
+        )
+        series = {
+            city: WeatherSeriesSchema(
+                percentiles={percentile_label(p): [] for p in percentiles}
+            )
+            for city in cities
+        }
+        connection = await self.db_session.connection()
+        rollup = None if percentiles else pick_rollup(bucket_seconds, start, end)
+        if rollup is not None:
+            logger.debug("Aggregating from %s", rollup[1].__name__)
+            rows = self._aggregate_rollup(rollup[1], cities, start, end, bucket_seconds)
+        elif connection.dialect.name == "postgresql":
+            rows = self._aggregate_in_sql(
+                cities, start, end, bucket_seconds, percentiles
+            )
+        else:
+            rows = self._aggregate_in_python(
+                cities, start, end, bucket_seconds, percentiles
+            )
+
+        async for city, bucket, count, low, high, mean, *values in rows:
+            entry = series[city]
+            entry.time.append(bucket)
+            entry.count.append(count)
+            entry.min.append(low)
+            entry.max.append(high)
+            entry.avg.append(mean)
+            for fraction, value in zip(percentiles, values):
+                entry.percentiles[percentile_label(fraction)].append(value)
+        return series
+
+    async def _aggregate_rollup(
+        self,
+        model: type[WeatherRollup],
+        cities: Sequence[str],
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+    ) -> AsyncIterator[tuple[Any, ...]]:
+        """Yield aggregated rows merged from the buckets of a rollup table."""
+        command = (
+            select(model)
+            .where(
+                and_(
+                    model.city.in_(cities),
+                    model.bucket >= start,
+                    model.bucket < end,
+                )
+            )
+            .order_by(model.city, model.bucket)
+        )
+        result = await self.db_session.execute(command)
+
+        def key(row: Any) -> tuple[str, datetime]:
+            return row.city, bucket_start(row.bucket, bucket_seconds)
+
+        for (city, bucket), group in itertools.groupby(result.scalars(), key):
+            parts = list(group)
+            count = sum(part.count for part in parts)
+            yield (
+                city,
+                bucket,
+                count,
+                min(part.min_temperature for part in parts),
+                max(part.max_temperature for part in parts),
+                sum(part.sum_temperature for part in parts) / count,
+            )
+
+    async def _aggregate_in_sql(
+        self,
+        cities: Sequence[str],
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+        percentiles: Sequence[float],
+    ) -> AsyncIterator[tuple[Any, ...]]:
+        """Yield aggregated rows computed by PostgreSQL."""
+        bucket = func.date_bin(
+            literal(timedelta(seconds=bucket_seconds), Interval),
+            Weather.time_point,
+            literal(BUCKET_ORIGIN),
+        ).label("bucket")
+        command = (
+            select(
+                Weather.city,
+                bucket,
+                func.count(),
+                func.min(Weather.temperature),
+                func.max(Weather.temperature),
+                func.avg(Weather.temperature),
+                *(
+                    func.percentile_cont(literal(p, Float)).within_group(
+                        Weather.temperature
+                    )
+                    for p in percentiles
+                ),
+            )
+            .where(
+                and_(
+                    Weather.city.in_(cities),
+                    Weather.time_point >= start,
+                    Weather.time_point < end,
+                )
+            )
+            .group_by(Weather.city, bucket)
+            .order_by(Weather.city, bucket)
+        )
+        result = await self.db_session.execute(command)
+        for row in result:
+            yield tuple(row)
+
+    async def _aggregate_in_python(
+        self,
+        cities: Sequence[str],
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int,
+        percentiles: Sequence[float],
+    ) -> AsyncIterator[tuple[Any, ...]]:
+        """Yield aggregated rows computed from streamed raw readings."""
+        command = (
+            select(Weather.city, Weather.time_point, Weather.temperature)
+            .where(
+                and_(
+                    Weather.city.in_(cities),
+                    Weather.time_point >= start,
+                    Weather.time_point < end,
+                )
+            )
+            .order_by(Weather.city, Weather.time_point)
+            .execution_options(yield_per=1000)
+        )
+        result = await self.db_session.stream(command)
+
+        def key(row: Any) -> tuple[str, datetime]:
+            return row.city, bucket_start(row.time_point, bucket_seconds)
+
+        # Rows arrive ordered by (city, time), so each bucket is contiguous.
+        pending: list[Any] = []
+        async for partition in result.partitions():
+            pending.extend(partition)
+            groups = [(k, list(g)) for k, g in itertools.groupby(pending, key)]
+            pending = groups.pop()[1] if groups else []
+            for group_key, group in groups:
+                yield _bucket_stats(group_key, group, percentiles)
+        if pending:
+            yield _bucket_stats(key(pending[0]), pending, percentiles)
+
 
-async def init_models() -> None:
-    """Initialize database models."""
-    logger.info("Initializing database models...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database models initialized successfully.")
+def _bucket_stats(
+    key: tuple[str, datetime], rows: list[Any], percentiles: Sequence[float]
+) -> tuple[Any, ...]:
+    """Summarize the rows of one (city, bucket) group."""
+    values = sorted(row.temperature for row in rows)
+    return (
+        *key,
+        len(values),
+        values[0],
+        values[-1],
+        sum(values) / len(values),
+        *(percentile_cont(values, p) for p in percentiles),
+    )
@@ -1,11 +1,17 @@
 import logging
-import re
 from typing import AsyncGenerator
 
+from auth import TokenVerifier, token_verifier
 from base import async_session
+from cache import WeatherCache, weather_cache
 from config import config
 from db import DB
 from fastapi import Depends, HTTPException, Request, status
+from live import LiveHub, live_hub
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.requests import HTTPConnection
 
 logger = logging.getLogger(__name__)
 logger.setLevel(config.loglevel)
@@ -21,7 +27,7 @@ async def get_db() -> AsyncGenerator[DB, None]:
     """
     async with async_session() as session:
         try:
-            logger.info("Acquiring new DB session")
+            logger.debug("Acquiring new DB session")
             yield DB(session)
         except Exception as e:
             logger.error("Error occurred while acquiring DB session: %s", e)
@@ -29,6 +35,48 @@ async def get_db() -> AsyncGenerator[DB, None]:
             raise e
 
 
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Dependency providing the session factory for endpoints that manage
+    their own session, such as streaming responses that outlive the request
+    handler.
+
+    Returns:
+        async_sessionmaker[AsyncSession]: Factory of async database sessions.
+    """
+    return async_session
+
+
+def get_cache() -> WeatherCache:
+    """
+    Dependency providing the shared weather response cache.
+
+    Returns:
+        WeatherCache: Process-wide cache instance.
+    """
+    return weather_cache
+
+
+def get_live_hub() -> LiveHub:
+    """
+    Dependency providing the live update hub of this process.
+
+    Returns:
+        LiveHub: Process-wide hub with its pub/sub listener.
+    """
+    return live_hub
+
+
+def get_verifier() -> TokenVerifier:
+    """
+    Dependency providing the API key verifier.
+
+    Returns:
+        TokenVerifier: Process-wide verifier with its verdict cache.
+    """
+    return token_verifier
+
+
 async def get_token(request: Request) -> str:
     """
     Extracts the token from the 'x-token' header of the request.
@@ -45,7 +93,6 @@ async def get_token(request: Request) -> str:
     """
     token = request.headers.get("x-token")
     if token:
-        logger.info("Token found in request headers")
         return token
     logger.warning("Token missing in request headers")
     raise HTTPException(
@@ -53,25 +100,78 @@ async def get_token(request: Request) -> str:
     )
 
 
-async def verify_token(token: str = Depends(get_token)) -> bool:
+async def verify_token(
+    token: str = Depends(get_token),
+    verifier: TokenVerifier = Depends(get_verifier),
+) -> bool:
     """
-    Verifies that the token is a valid 32-character alphanumeric string.
-    Raises an HTTP 401 error if the token format is invalid.
+    Verifies the token against the configured API key store and applies
+    its rate limit.
 
     Args:
         token (str): The token to verify.
+        verifier (TokenVerifier): Verifier with the key store.
 
     Returns:
         bool: True if the token is valid.
 
     Raises:
-        HTTPException: If the token format is invalid.
+        HTTPException: 401 if the token is invalid, 429 if it exceeded its
+            rate, 503 if the key store is unavailable.
+    """
+    try:
+        token_hash = await verifier.verify(token)
+    except (RedisError, SQLAlchemyError) as e:
+        logger.error("API key store unavailable: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication unavailable",
+        ) from e
+
+    if token_hash is None:
+        logger.warning("Invalid token")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate token"
+        )
+    if not await verifier.allow(token_hash):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": "1"},
+        )
+    return True
+
+
+async def get_live_token(connection: HTTPConnection) -> str:
+    """
+    Extracts the token of a live update connection.
+
+    Browsers cannot set headers on ``EventSource`` and ``WebSocket``
+    connections, so the ``token`` query parameter is accepted as well.
+
+    Args:
+        connection (HTTPConnection): The incoming request or WebSocket.
+
+    Returns:
+        str: The extracted token.
+
+    Raises:
+        HTTPException: If neither the header nor the parameter is present.
     """
-    pattern = r"^[a-zA-Z0-9]{32}$"
-    if re.match(pattern, token):
-        logger.info("Token verified successfully")
-        return True
-    logger.warning("Invalid token format")
+    token = connection.headers.get("x-token") or connection.query_params.get("token")
+    if token:
+        return token
+    logger.warning("Token missing in live connection")
     raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate token"
+        status_code=status.HTTP_403_FORBIDDEN, detail="Not authenticated"
     )
+
+
+async def verify_live_token(
+    token: str = Depends(get_live_token),
+    verifier: TokenVerifier = Depends(get_verifier),
+) -> bool:
+    """
+    Verifies the token of a live update connection like ``verify_token``.
+    """
+    return await verify_token(token, verifier)
@@ -0,0 +1,42 @@
+from typing import Any
+
+from base import engine
+from config import config as settings
+from metrics import mark_process_dead, reset_multiproc_dir
+from server import worker_count
+
+# Module-level names are gunicorn settings; `config` is one of them, hence
+# the import of the application config as `settings`.
+bind = settings.server.bind
+workers = worker_count()
+worker_class = "server.Worker"
+backlog = settings.server.backlog
+# Must exceed the upstream keepalive_timeout of nginx.
+keepalive = settings.server.keepalive
+timeout = settings.server.timeout
+graceful_timeout = settings.server.graceful_timeout
+# Workers are recycled after a random number of requests, so they do not
+# all restart at once.
+max_requests = settings.server.max_requests
+max_requests_jitter = settings.server.max_requests_jitter
+# The app is imported once by the master and shared copy-on-write.
+preload_app = settings.server.preload
+forwarded_allow_ips = settings.server.forwarded_allow_ips
+
+
+def on_starting(server: Any) -> None:
+    """Clear the metrics of a previous run before workers are forked."""
+    reset_multiproc_dir()
+    server.log.info(
+        "Starting %d %s workers.", server.cfg.workers, server.cfg.worker_class_str
+    )
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """Give the worker its own connection pool instead of the master's."""
+    engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    """Drop the live gauges of an exited worker."""
+    mark_process_dead(worker.pid)
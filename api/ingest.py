@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Sequence
+
+from cache import WeatherCache
+from config import config
+from db import DB, WeatherReading
+from live import LivePublisher
+from metrics import INGEST_BACKLOG, INGEST_FLUSHED
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+# Id of a stream entry and its reading, None if it could not be decoded.
+Entry = tuple[bytes, WeatherReading | None]
+
+
+def encode_reading(reading: WeatherReading) -> dict[str, str]:
+    """
+    Convert a reading to the fields of a stream entry.
+
+    Args:
+        reading (WeatherReading): Reading to append.
+
+    Returns:
+        dict[str, str]: Entry fields.
+    """
+    return {
+        "city": reading.city,
+        "temperature": repr(reading.temperature),
+        "time_point": reading.time_point.isoformat(),
+    }
+
+
+def decode_reading(fields: dict[bytes, bytes]) -> WeatherReading:
+    """
+    Convert the fields of a stream entry back to a reading.
+
+    Args:
+        fields (dict[bytes, bytes]): Entry fields.
+
+    Returns:
+        WeatherReading: Decoded reading.
+
+    Raises:
+        KeyError: A field is missing.
+        ValueError: A field is malformed.
+    """
+    return WeatherReading(
+        fields[b"city"].decode(),
+        float(fields[b"temperature"]),
+        datetime.fromisoformat(fields[b"time_point"].decode()),
+    )
+
+
+class ReadingStream:
+    """
+    Redis stream buffering readings between the fetch task and the flusher.
+
+    Entries are consumed through a consumer group, so every reading is
+    delivered to one flusher and redelivered until it is acknowledged.
+    Acknowledged entries are deleted, so the stream length is the backlog.
+    """
+
+    def __init__(self, client: Redis, name: str, group: str):
+        """
+        Initialize the stream.
+
+        Args:
+            client (Redis): Redis client.
+            name (str): Stream key.
+            group (str): Consumer group of the flushers.
+        """
+        self.client = client
+        self.name = name
+        self.group = group
+
+    async def append(self, readings: Sequence[WeatherReading]) -> int:
+        """
+        Append readings in one round-trip.
+
+        Args:
+            readings (Sequence[WeatherReading]): Readings to store.
+
+        Returns:
+            int: Stream length after the append.
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        for reading in readings:
+            pipeline.xadd(self.name, encode_reading(reading))  # type: ignore[arg-type]
+        pipeline.xlen(self.name)
+        length = int((await pipeline.execute())[-1])
+        if length > config.ingest.backlog_warning:
+            logger.warning("Ingestion backlog is at %d readings.", length)
+        return length
+
+    async def ensure_group(self) -> None:
+        """Create the stream and its consumer group unless they exist."""
+        try:
+            await self.client.xgroup_create(
+                self.name, self.group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read(
+        self,
+        consumer: str,
+        count: int,
+        block_ms: int,
+        claim_idle_ms: int,
+        start: str = ">",
+    ) -> list[Entry]:
+        """
+        Take a batch of entries for ``consumer``.
+
+        Entries delivered to another consumer and left unacknowledged for
+        ``claim_idle_ms`` (e.g. because its flusher died) are claimed first.
+
+        Args:
+            consumer (str): Name of the reading flusher.
+            count (int): Maximum number of entries.
+            block_ms (int): How long to wait for new entries.
+            claim_idle_ms (int): Idle time after which entries are claimed.
+            start (str): ``>`` for new entries, ``0`` for the entries
+                already delivered to ``consumer``.
+
+        Returns:
+            list[Entry]: Entry ids with their readings, None for entries
+                that cannot be decoded.
+        """
+        claimed = await self.client.xautoclaim(
+            self.name,
+            self.group,
+            consumer,
+            min_idle_time=claim_idle_ms,
+            start_id="0-0",
+            count=count,
+        )
+        messages = claimed[1]
+        if not messages:
+            response = await self.client.xreadgroup(
+                self.group,
+                consumer,
+                {self.name: start},
+                count=count,
+                block=None if start != ">" else block_ms,
+            )
+            messages = response[0][1] if response else []
+
+        entries: list[Entry] = []
+        for entry_id, fields in messages:
+            try:
+                entries.append((entry_id, decode_reading(fields)))
+            except (KeyError, ValueError, TypeError) as e:
+                logger.error("Dropping malformed stream entry %s: %s", entry_id, e)
+                entries.append((entry_id, None))
+        return entries
+
+    async def ack(self, entry_ids: Sequence[bytes]) -> None:
+        """
+        Acknowledge and delete stored entries.
+
+        Args:
+            entry_ids (Sequence[bytes]): Ids of the entries.
+        """
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.xack(self.name, self.group, *entry_ids)
+        pipeline.xdel(self.name, *entry_ids)
+        await pipeline.execute()
+
+    async def backlog(self) -> dict[str, int]:
+        """
+        Measure the readings waiting to be stored.
+
+        Returns:
+            dict[str, int]: ``length`` of the stream and ``pending`` entries
+                delivered but not yet acknowledged.
+        """
+        length = await self.client.xlen(self.name)
+        try:
+            pending = (await self.client.xpending(self.name, self.group))["pending"]
+        except ResponseError:
+            pending = 0
+        return {"length": int(length), "pending": int(pending)}
+
+
+class Flusher:
+    """
+    Drains the reading stream into the database in large batches.
+
+    Delivery is at least once: entries are acknowledged only after their
+    batch is committed, and redelivered entries are harmless because
+    readings are stored with duplicates skipped.
+    """
+
+    def __init__(
+        self,
+        stream: ReadingStream,
+        session_factory: async_sessionmaker[AsyncSession],
+        cache: WeatherCache,
+        consumer: str,
+        publisher: LivePublisher | None = None,
+    ):
+        """
+        Initialize the flusher.
+
+        Args:
+            stream (ReadingStream): Stream to drain.
+            session_factory (async_sessionmaker[AsyncSession]): Database sessions.
+            cache (WeatherCache): Cache to invalidate for the stored days.
+            consumer (str): Name of this flusher in the consumer group.
+            publisher (LivePublisher | None): Announces newly stored
+                readings to live subscribers.
+        """
+        self.stream = stream
+        self.session_factory = session_factory
+        self.cache = cache
+        self.consumer = consumer
+        self.publisher = publisher
+
+    async def flush_once(self, start: str = ">") -> int:
+        """
+        Store one batch of readings and acknowledge it.
+
+        Args:
+            start (str): ``>`` for new entries, ``0`` to resume the entries
+                this consumer took before a restart.
+
+        Returns:
+            int: Number of entries taken from the stream.
+        """
+        ingest = config.ingest
+        entries = await self.stream.read(
+            self.consumer,
+            ingest.batch_size,
+            ingest.block_ms,
+            ingest.claim_idle_ms,
+            start,
+        )
+        if not entries:
+            return 0
+
+        readings = [reading for _, reading in entries if reading is not None]
+        async with self.session_factory() as session:
+            inserted = await DB(session).store_new_weather(readings)
+        await self.stream.ack([entry_id for entry_id, _ in entries])
+
+        INGEST_FLUSHED.labels("stored").inc(len(inserted))
+        INGEST_FLUSHED.labels("duplicate").inc(len(readings) - len(inserted))
+        INGEST_FLUSHED.labels("malformed").inc(len(entries) - len(readings))
+        logger.info(
+            "Flushed %d readings (%d new) from the ingestion stream.",
+            len(entries),
+            len(inserted),
+        )
+        await self.cache.invalidate({(r.city, r.time_point.date()) for r in readings})
+        if self.publisher is not None and inserted:
+            await self.publisher.publish(inserted)
+        return len(entries)
+
+    async def report(self) -> dict[str, int]:
+        """
+        Publish the backlog as metrics and warn when it keeps growing.
+
+        Returns:
+            dict[str, int]: Backlog of the stream.
+        """
+        backlog = await self.stream.backlog()
+        for state, value in backlog.items():
+            INGEST_BACKLOG.labels(state).set(value)
+        if backlog["length"] > config.ingest.backlog_warning:
+            logger.warning("Ingestion backlog is at %d readings.", backlog["length"])
+        return backlog
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Flush batches until ``stop`` is set.
+
+        Errors are logged and the batch is retried after a pause, so an
+        unavailable database delays ingestion instead of losing readings.
+
+        Args:
+            stop (asyncio.Event): Set to finish after the current batch.
+        """
+        await self.stream.ensure_group()
+        logger.info("Flusher %s started.", self.consumer)
+        start = "0"
+        reported = 0.0
+        while not stop.is_set():
+            try:
+                if time.monotonic() - reported >= config.ingest.report_interval:
+                    await self.report()
+                    reported = time.monotonic()
+                if not await self.flush_once(start) and start == "0":
+                    start = ">"
+            except (RedisError, SQLAlchemyError, OSError) as e:
+                logger.error("Flushing readings failed, retrying: %s", e)
+                # The failed batch stays pending for this consumer.
+                start = "0"
+                await asyncio.sleep(1)
+        logger.info("Flusher %s stopped.", self.consumer)
+
+
+def create_stream(client: Redis | None = None) -> ReadingStream:
+    """
+    Create the reading stream configured in ``config.ingest``.
+
+    Args:
+        client (Redis | None): Redis client, from ``config.redis`` by default.
+
+    Returns:
+        ReadingStream: Stream of the fetch task and the flusher.
+    """
+    return ReadingStream(
+        client or Redis.from_url(config.redis.url),
+        config.ingest.stream,
+        config.ingest.group,
+    )
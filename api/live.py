@@ -0,0 +1,264 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Iterable
+
+import orjson
+from config import config
+from db import WeatherReading
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+
+class LiveHubFull(Exception):
+    """This process already serves the maximum number of subscribers."""
+
+
+def channel(city: str) -> str:
+    """Name of the pub/sub channel carrying the readings of ``city``."""
+    return f"{config.live.prefix}:{city}"
+
+
+class LivePublisher:
+    """Announces stored readings on the per-city channels."""
+
+    def __init__(self, client: Redis):
+        """
+        Initialize the publisher.
+
+        Args:
+            client (Redis): Redis client.
+        """
+        self.client = client
+
+    async def publish(self, readings: Iterable[WeatherReading]) -> None:
+        """
+        Publish the newest of the readings of every city.
+
+        Must be called after the readings are committed. Redis errors are
+        logged: live updates are best effort and must not fail ingestion.
+
+        Args:
+            readings (Iterable[WeatherReading]): Readings just stored.
+        """
+        newest: dict[str, WeatherReading] = {}
+        for reading in readings:
+            current = newest.get(reading.city)
+            if current is None or reading.time_point > current.time_point:
+                newest[reading.city] = reading
+        if not newest:
+            return
+
+        pipeline = self.client.pipeline(transaction=False)
+        for city, reading in newest.items():
+            pipeline.publish(channel(city), orjson.dumps(reading._asdict()))
+        try:
+            await pipeline.execute()
+        except RedisError as e:
+            logger.warning("Publishing live readings failed: %s", e)
+
+
+class Subscription:
+    """
+    Live readings of some cities for one client.
+
+    Only the latest message of every city is kept, so a burst of readings
+    or a slow client never queues more than one message per city.
+    """
+
+    def __init__(self, cities: Iterable[str]):
+        """
+        Initialize the subscription.
+
+        Args:
+            cities (Iterable[str]): Cities to receive.
+        """
+        self.cities = frozenset(cities)
+        self.pending: dict[str, bytes] = {}
+        self.event = asyncio.Event()
+        self.closed = False
+
+    def push(self, city: str, message: bytes) -> None:
+        """Replace the pending message of ``city``."""
+        self.pending[city] = message
+        self.event.set()
+
+    def close(self) -> None:
+        """Wake up the consumer and make further ``get`` calls return nothing."""
+        self.closed = True
+        self.event.set()
+
+    async def get(self, timeout: float) -> list[bytes]:
+        """
+        Wait for messages.
+
+        After the first message arrives, further ones are collected for
+        ``config.live.coalesce`` seconds and delivered together.
+
+        Args:
+            timeout (float): Seconds to wait for a message.
+
+        Returns:
+            list[bytes]: Latest message of every updated city; empty on
+                timeout or once the subscription is closed.
+        """
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        if config.live.coalesce > 0 and not self.closed:
+            await asyncio.sleep(config.live.coalesce)
+        self.event.clear()
+        if self.closed:
+            return []
+        messages = list(self.pending.values())
+        self.pending.clear()
+        return messages
+
+
+class LiveHub:
+    """
+    Fans out live readings to the subscribers of this process.
+
+    A single pub/sub connection per process listens to every city channel
+    and hands messages to the subscriptions of that city, so an idle
+    subscriber costs one ``Subscription`` and no Redis connection.
+    """
+
+    def __init__(self, client: Redis, max_subscribers: int):
+        """
+        Initialize the hub.
+
+        Args:
+            client (Redis): Redis client.
+            max_subscribers (int): Subscribers this process accepts at most.
+        """
+        self.client = client
+        self.max_subscribers = max_subscribers
+        self.subscribers: dict[str, set[Subscription]] = {}
+        self.active: set[Subscription] = set()
+        self._pubsub: PubSub | None = None
+        self._reader: asyncio.Task[None] | None = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, cities: Iterable[str]) -> Subscription:
+        """
+        Register a subscriber, starting the listener on first use.
+
+        Args:
+            cities (Iterable[str]): Cities to receive.
+
+        Returns:
+            Subscription: Subscription to read and finally ``unsubscribe``.
+
+        Raises:
+            LiveHubFull: The process serves ``max_subscribers`` already.
+            RedisError: The listener could not subscribe.
+        """
+        if len(self.active) >= self.max_subscribers:
+            raise LiveHubFull(f"{len(self.active)} live subscribers")
+        await self._start()
+
+        subscription = Subscription(cities)
+        for city in subscription.cities:
+            self.subscribers.setdefault(city, set()).add(subscription)
+        self.active.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber and close its subscription."""
+        subscription.close()
+        if subscription not in self.active:
+            return
+        self.active.discard(subscription)
+        for city in subscription.cities:
+            subscribers = self.subscribers[city]
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[city]
+
+    def dispatch(self, city: str, message: bytes) -> None:
+        """Hand a message to every subscriber of ``city``."""
+        for subscription in self.subscribers.get(city, ()):
+            subscription.push(city, message)
+
+    async def _start(self) -> None:
+        """Subscribe to the city channels and start the listener task."""
+        async with self._lock:
+            if self._reader is not None and not self._reader.done():
+                return
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.psubscribe(channel("*"))
+            self._reader = asyncio.create_task(self._listen(self._pubsub))
+            logger.info("Live hub listening on %s.", channel("*"))
+
+    async def _listen(self, pubsub: PubSub) -> None:
+        """Dispatch published messages until cancelled."""
+        offset = len(channel(""))
+        while True:
+            try:
+                message = await pubsub.get_message(timeout=None)
+            except RedisError as e:
+                # The connection is re-established and re-subscribed on
+                # the next read.
+                logger.warning("Live hub connection failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            if message is None or message["type"] != "pmessage":
+                continue
+            self.dispatch(message["channel"].decode()[offset:], message["data"])
+
+    async def close(self) -> None:
+        """Stop the listener and close its connection."""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()  # type: ignore[no-untyped-call]
+            self._pubsub = None
+        for subscription in list(self.active):
+            self.unsubscribe(subscription)
+        await self.client.aclose()
+
+
+async def sse_events(
+    subscription: Subscription, heartbeat: float
+) -> AsyncIterator[bytes]:
+    """
+    Render a subscription as a Server-Sent Events stream.
+
+    Every message is a ``reading`` event; a comment line is sent after
+    ``heartbeat`` idle seconds so proxies keep the connection open.
+
+    Args:
+        subscription (Subscription): Subscription to read.
+        heartbeat (float): Idle seconds between keep-alive comments.
+
+    Yields:
+        bytes: Encoded events.
+    """
+    yield b": connected\n\n"
+    while True:
+        messages = await subscription.get(heartbeat)
+        if subscription.closed:
+            return
+        if not messages:
+            yield b": keep-alive\n\n"
+        for message in messages:
+            yield b"event: reading\ndata: " + message + b"\n\n"
+
+
+def create_hub() -> LiveHub:
+    """Create the live hub of this process from ``config.live``."""
+    return LiveHub(Redis.from_url(config.redis.url), config.live.max_subscribers)
+
+
+live_hub = create_hub()
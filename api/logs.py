@@ -0,0 +1,149 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Callable
+
+import orjson
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+
+class SampleFilter(logging.Filter):
+    """
+    Let through only a fraction of the records below INFO.
+
+    Per-request records are logged at DEBUG; sampling them keeps debug
+    logging affordable on a busy instance.
+    """
+
+    def __init__(self, rate: float):
+        """
+        Initialize the filter.
+
+        Args:
+            rate (float): Share of DEBUG records to keep, between 0 and 1.
+        """
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.INFO or random.random() < self.rate
+
+
+def create_target(
+    output: str,
+    directory: str,
+    json_format: bool,
+    max_bytes: int,
+    backup_count: int,
+) -> logging.Handler:
+    """
+    Create the handler that actually writes the records of this process.
+
+    Files are per process (``app.<pid>.log``): rotating one file from several
+    gunicorn workers is not safe.
+
+    Args:
+        output (str): ``"file"`` or ``"stdout"``.
+        directory (str): Directory of the log files.
+        json_format (bool): Write JSON lines instead of plain text.
+        max_bytes (int): Size at which a log file is rotated.
+        backup_count (int): Rotated files to keep.
+
+    Returns:
+        logging.Handler: Handler for the listener thread.
+    """
+    handler: logging.Handler
+    if output == "stdout":
+        handler = logging.StreamHandler(sys.stdout)
+    else:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            Path(directory) / f"app.{os.getpid()}.log",
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+        )
+    if json_format:
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+        )
+    return handler
+
+
+class ProcessQueueHandler(QueueHandler):
+    """
+    Queue handler writing through a listener thread of the current process.
+
+    Logging calls only put the record on an in-memory queue; formatting and
+    I/O happen on the listener thread, off the event loop. The arguments of
+    a record are therefore rendered after the call returns, so they must not
+    be mutated once logged. Threads do not survive a fork, so the listener
+    (and its target handler) is started lazily by the first record of every
+    process.
+    """
+
+    def __init__(self, create_target: Callable[[], logging.Handler]):
+        """
+        Initialize the handler.
+
+        Args:
+            create_target (Callable[[], logging.Handler]): Builds the
+                handler used by the listener of a process.
+        """
+        super().__init__(queue.SimpleQueue())
+        self.create_target = create_target
+        self.listener: QueueListener | None = None
+        self.pid: int | None = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves the process, so the record is queued as is
+        # and the listener's target formats it.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.pid != os.getpid():
+            self.start()
+        self.queue.put_nowait(record)
+
+    def start(self) -> None:
+        """Start the listener of the current process."""
+        # Records queued by the parent before the fork belong to its listener.
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, self.create_target())
+        self.listener.start()
+        self.pid = os.getpid()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Flush the queued records and stop the listener of this process."""
+        if self.listener is None or self.pid != os.getpid():
+            return
+        listener, self.listener = self.listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        self.pid = None
@@ -1,14 +1,19 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+from base import check_database, pool_stats, warm_up_pool
 from config import config
-from db import init_models
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from live import live_hub
+from metrics import PrometheusMiddleware, render
+from routers.live_router import router as live_router
 from routers.weather_router import router
+from sqlalchemy.exc import SQLAlchemyError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 logger = logging.getLogger(__name__)
@@ -24,12 +29,22 @@ logger.addHandler(config.log_handler)
 async def lifespan(fastapi_app: FastAPI) -> AsyncGenerator[None, None]:
     """
     Application lifespan context manager.
-    Initializes database models before the application starts.
+
+    Opens database connections before the worker reports ready and closes
+    the live update hub on shutdown. The schema is not touched here; it is
+    migrated once per deployment by `manage.py migrate`.
     """
-    logger.info("Initializing database models...")
-    await init_models()  # Initialize the database models
-    logger.info("Database models initialized.")
+    fastapi_app.state.ready = False
+    try:
+        opened = await warm_up_pool(config.db.warmup_connections)
+        logger.info("Opened %d database connections.", opened)
+    except (SQLAlchemyError, OSError) as e:
+        # Readiness keeps failing until the database is reachable.
+        logger.error("Database warm-up failed: %s", e)
+    fastapi_app.state.ready = True
     yield
+    fastapi_app.state.ready = False
+    await live_hub.close()
 
 
 app = FastAPI(
@@ -37,6 +52,7 @@ app = FastAPI(
     version="0.0.1",  # Version of the API
     lifespan=lifespan,  # Lifespan handler to manage startup/shutdown events
 )
+app.add_middleware(PrometheusMiddleware, pool_stats=pool_stats)
 
 
 @app.exception_handler(StarletteHTTPException)
@@ -47,6 +63,7 @@ async def http_exception_handler(
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail, "error": "HTTPException"},
+        headers=exc.headers,
     )
 
 
@@ -61,8 +78,44 @@ async def validation_exception_handler(
     )
 
 
-logger.info("Starting FastAPI application...")
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Expose Prometheus metrics, merged across worker processes.
+    """
+    payload, content_type = render()
+    return Response(payload, media_type=content_type)
+
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz() -> JSONResponse:
+    """
+    Liveness probe: the worker is running its event loop.
+
+    Dependencies are not checked, so an unavailable database does not get
+    healthy workers restarted.
+    """
+    return JSONResponse({"status": "ok"})
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz(request: Request) -> JSONResponse:
+    """
+    Readiness probe: the worker has started and can reach the database.
+
+    Returns 503 while the worker is starting or shutting down, or when the
+    database does not answer within ``config.db.readiness_timeout``.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse({"status": "starting"}, status_code=503)
+    try:
+        await asyncio.wait_for(check_database(), config.db.readiness_timeout)
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+        logger.warning("Not ready, database unavailable: %s", e)
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    return JSONResponse({"status": "ready", "pool": pool_stats()})
+
 
 # Include weather-related API routes
 app.include_router(router, prefix="/weather")
-logger.info("Weather router included in the application.")
+app.include_router(live_router, prefix="/weather")
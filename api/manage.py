@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import logging
+import secrets
+import signal
+from datetime import date, datetime, time, timedelta
+
+from auth import hash_token
+from base import async_session, engine
+from cache import weather_cache
+from config import config
+from db import DB
+from ingest import Flusher, create_stream
+from live import LivePublisher
+from metrics import registry, reset_multiproc_dir
+from migrate import current_revision, rollups_created, upgrade
+from models.api_key_model import ApiKey
+from models.weather_model import Weather
+from partitions import ensure_upcoming_partitions
+from prometheus_client import start_http_server
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+
+async def migrate(revision: str) -> None:
+    """
+    Migrate the schema and create the upcoming weather partitions.
+
+    Runs once per deployment, before the API and workers start, instead of
+    every worker creating tables on startup. Concurrent runs wait for each
+    other on PostgreSQL. When the migration creates the rollup tables, they
+    are rebuilt from the readings already stored.
+
+    Args:
+        revision (str): Target revision, usually ``head``.
+    """
+    async with engine.begin() as conn:
+        before = await conn.run_sync(upgrade, revision)
+        after = await conn.run_sync(current_revision)
+        months = await ensure_upcoming_partitions(conn)
+    print(f"Migrated the schema from {before} to {after}.")
+    print(f"Ensured partitions from {months[0]} to {months[-1]}.")
+
+    if rollups_created(before, after):
+        async with async_session() as session:
+            db = DB(session)
+            oldest = await db.oldest_time_point()
+            if oldest is not None:
+                folded = await db.rebuild_rollups(
+                    oldest, datetime.now() + timedelta(days=1)
+                )
+                print(f"Rebuilt rollups from {folded} readings.")
+    await engine.dispose()
+
+
+async def rebuild_rollups(start: date, end: date) -> None:
+    """
+    Recompute the hourly and daily rollups from raw readings.
+
+    Args:
+        start (date): First day to rebuild.
+        end (date): Day after the last day to rebuild.
+    """
+    async with async_session() as session:
+        folded = await DB(session).rebuild_rollups(
+            datetime.combine(start, time.min), datetime.combine(end, time.min)
+        )
+    print(f"Rebuilt rollups for [{start}, {end}) from {folded} readings.")
+
+
+async def deduplicate_weather() -> None:
+    """
+    Remove repeated readings and make (city, time_point) unique.
+
+    Upgrades a database created before readings were deduplicated: the
+    duplicates are deleted, the city/time index is recreated as unique and
+    the rollups are rebuilt without the deleted rows.
+    """
+    async with async_session() as session:
+        db = DB(session)
+        oldest = await db.oldest_time_point()
+        deleted = await db.delete_duplicates()
+        if oldest is not None and deleted:
+            await db.rebuild_rollups(oldest, datetime.now() + timedelta(days=1))
+
+    index = next(
+        index
+        for index in Weather.__table__.indexes
+        if index.name == "ix_weather_city_time_point"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: index.drop(sync_conn, checkfirst=True))
+        await conn.run_sync(index.create)
+    print(f"Deleted {deleted} duplicate readings.")
+
+
+async def flush_readings() -> None:
+    """
+    Store the readings queued by write-behind ingestion until stopped.
+
+    Serves the flusher metrics on ``config.metrics.flusher_port`` and stops
+    after the current batch on SIGINT or SIGTERM.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    if config.metrics.flusher_port:
+        reset_multiproc_dir()
+        start_http_server(config.metrics.flusher_port, registry=registry())
+
+    stream = create_stream()
+    flusher = Flusher(
+        stream,
+        async_session,
+        weather_cache,
+        config.ingest.consumer,
+        publisher=LivePublisher(stream.client),
+    )
+    try:
+        await flusher.run(stop)
+    finally:
+        await stream.client.aclose()
+        await weather_cache.close()
+        await engine.dispose()
+
+
+async def create_api_key(name: str) -> None:
+    """
+    Generate an API key and store its digest in the configured key store.
+
+    The key itself is printed once and never stored.
+
+    Args:
+        name (str): Owner or purpose of the key.
+    """
+    token = secrets.token_hex(16)
+    token_hash = hash_token(token)
+    if config.auth.backend == "redis":
+        client = Redis.from_url(config.redis.url)
+        await client.sadd(f"{config.auth.prefix}:keys", token_hash)
+        await client.aclose()
+    elif config.auth.backend == "db":
+        async with async_session() as session:
+            session.add(ApiKey(name=name, key_hash=token_hash))
+            await session.commit()
+    else:
+        print("AUTH_BACKEND=pattern accepts any 32 character alphanumeric token.")
+    print(token)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of the maintenance command line."""
+    parser = argparse.ArgumentParser(description="LDI maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser(
+        "migrate", help="Migrate the database schema to the latest revision"
+    )
+    migrate_parser.add_argument("--revision", default="head")
+
+    rebuild = commands.add_parser(
+        "rebuild-rollups", help="Recompute rollup tables from raw readings"
+    )
+    rebuild.add_argument("--start", type=date.fromisoformat, required=True)
+    rebuild.add_argument("--end", type=date.fromisoformat, required=True)
+
+    commands.add_parser(
+        "dedupe-weather", help="Delete repeated readings and enforce uniqueness"
+    )
+
+    commands.add_parser(
+        "flush-readings", help="Store readings queued by write-behind ingestion"
+    )
+
+    create_key = commands.add_parser(
+        "create-api-key", help="Generate an API key in the configured key store"
+    )
+    create_key.add_argument("--name", required=True)
+
+    args = parser.parse_args(argv)
+    logger.info("Running maintenance command %s", args.command)
+    if args.command == "migrate":
+        asyncio.run(migrate(args.revision))
+    elif args.command == "rebuild-rollups":
+        asyncio.run(rebuild_rollups(args.start, args.end))
+    elif args.command == "dedupe-weather":
+        asyncio.run(deduplicate_weather())
+    elif args.command == "flush-readings":
+        asyncio.run(flush_readings())
+    elif args.command == "create-api-key":
+        asyncio.run(create_api_key(args.name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import logging
+import os
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Any, Awaitable, Callable, ParamSpec, TypeVar
+
+from config import config
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# Set by gunicorn.conf.py / the Celery worker; every process then writes its
+# samples to files in this directory and scrapes merge them.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR is not None:
+    Path(MULTIPROC_DIR).mkdir(parents=True, exist_ok=True)
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route and status code.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served.",
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of database operations.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_ROWS = Histogram(
+    "db_query_rows",
+    "Rows read or written by database operations.",
+    ["operation"],
+    buckets=ROW_BUCKETS,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections of the database pool by state.",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by tier and result.",
+    ["tier", "result"],
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Duration of Celery tasks by final state.",
+    ["task", "state"],
+    buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0),
+)
+TASK_FAILURES = Counter(
+    "celery_task_failures_total",
+    "Celery tasks that raised an exception.",
+    ["task"],
+)
+INGEST_BACKLOG = Gauge(
+    "ingest_backlog_readings",
+    "Readings in the ingestion stream by state.",
+    ["state"],
+    multiprocess_mode="max",
+)
+INGEST_FLUSHED = Counter(
+    "ingest_flushed_readings_total",
+    "Readings taken from the ingestion stream by outcome.",
+    ["outcome"],
+)
+
+
+def registry() -> CollectorRegistry:
+    """
+    Return the registry to expose.
+
+    Under gunicorn or Celery's prefork pool every process has its own
+    metrics, so the registry merges the per-process files instead of
+    reporting only the process that happened to serve the scrape.
+
+    Returns:
+        CollectorRegistry: Registry to render.
+    """
+    if MULTIPROC_DIR is None:
+        return REGISTRY
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)  # type: ignore[no-untyped-call]
+    return merged
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        tuple[bytes, str]: Payload and its content type.
+    """
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
+
+
+def reset_multiproc_dir() -> None:
+    """
+    Start from an empty multiprocess directory.
+
+    Called by the parent process (gunicorn master, Celery worker) before it
+    forks, so samples of a previous run are not merged into the new one.
+    """
+    if MULTIPROC_DIR is None:
+        return
+    for stale in Path(MULTIPROC_DIR).glob("*.db"):
+        stale.unlink()
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drop the live gauges of an exited process.
+
+    Args:
+        pid (int): Process id of the exited worker.
+    """
+    if MULTIPROC_DIR is not None:
+        multiprocess.mark_process_dead(pid)  # type: ignore[no-untyped-call]
+
+
+def observe_pool(stats: dict[str, int]) -> None:
+    """
+    Publish the connection pool state of this process.
+
+    Args:
+        stats (dict[str, int]): Output of ``base.pool_stats``.
+    """
+    for state in ("checked_out", "idle", "overflow", "waiting"):
+        DB_POOL_CONNECTIONS.labels(state).set(stats[state])
+
+
+def observe_query(
+    operation: str, rows: Callable[[Any], int] = len
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """
+    Decorate a database coroutine to record its duration and row count.
+
+    Args:
+        operation (str): Label of the operation.
+        rows (Callable[[Any], int]): Derives the row count from the result.
+
+    Returns:
+        Callable: Decorator.
+    """
+    duration = DB_QUERY_DURATION.labels(operation)
+    row_count = DB_QUERY_ROWS.labels(operation)
+
+    def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            started = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            finally:
+                duration.observe(time.perf_counter() - started)
+            row_count.observe(rows(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording latency and in-flight requests per route.
+
+    Requests are labelled with the route template (``/weather/range``) rather
+    than the raw path, so query strings and path parameters do not create
+    new series; paths that match no route share the ``unmatched`` label.
+    """
+
+    def __init__(
+        self, app: ASGIApp, pool_stats: Callable[[], dict[str, int]] | None = None
+    ) -> None:
+        """
+        Initialize the middleware.
+
+        Args:
+            app (ASGIApp): Wrapped application.
+            pool_stats (Callable | None): Reports the DB pool state after
+                each request.
+        """
+        self.app = app
+        self.pool_stats = pool_stats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(method, path, str(status)).observe(
+                time.perf_counter() - started
+            )
+            if self.pool_stats is not None:
+                observe_pool(self.pool_stats())
@@ -0,0 +1,98 @@
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from config import config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+MIGRATIONS = Path(__file__).parent / "migrations"
+
+# Revision matching the schema that create_all built before migrations.
+BASELINE = "0001"
+
+# Revision creating the rollup tables, which then miss existing readings.
+ROLLUPS = "0003"
+
+# Serializes concurrent `manage.py migrate` runs on PostgreSQL.
+LOCK_ID = 0x4C4449
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    """
+    Build the Alembic configuration of the application.
+
+    Args:
+        connection (Connection | None): Connection to migrate through; the
+            migrations open their own from ``config.db.url`` otherwise.
+
+    Returns:
+        Config: Alembic configuration.
+    """
+    alembic = Config()
+    alembic.set_main_option("script_location", str(MIGRATIONS))
+    alembic.attributes["connection"] = connection
+    return alembic
+
+
+def current_revision(connection: Connection) -> str | None:
+    """Return the revision the database is at, None if it is unversioned."""
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def rollups_created(before: str | None, after: str | None) -> bool:
+    """
+    Tell whether migrating from ``before`` to ``after`` created the rollups.
+
+    Args:
+        before (str | None): Revision the database was at.
+        after (str | None): Revision the database is at now.
+
+    Returns:
+        bool: True if the rollups must be rebuilt from raw readings.
+    """
+    script = ScriptDirectory.from_config(alembic_config())
+
+    def has_rollups(revision: str | None) -> bool:
+        if revision is None:
+            return False
+        ancestors = script.iterate_revisions(revision, "base")
+        return any(ancestor.revision == ROLLUPS for ancestor in ancestors)
+
+    return has_rollups(after) and not has_rollups(before)
+
+
+def upgrade(connection: Connection, revision: str = "head") -> str | None:
+    """
+    Migrate the schema to ``revision`` within the connection's transaction.
+
+    A database created by ``create_all`` before migrations existed has the
+    weather table but no version; it is stamped with the baseline revision
+    first and later revisions add whatever it is missing.
+
+    Args:
+        connection (Connection): Connection with an open transaction.
+        revision (str): Target revision.
+
+    Returns:
+        str | None: Revision the database was at before.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": LOCK_ID})
+
+    alembic = alembic_config(connection)
+    before = current_revision(connection)
+    if before is None and inspect(connection).has_table("weather"):
+        logger.info("Stamping unversioned schema with revision %s.", BASELINE)
+        command.stamp(alembic, BASELINE)
+        before = BASELINE
+    command.upgrade(alembic, revision)
+    logger.info("Schema migrated from %s to %s.", before, revision)
+    return before
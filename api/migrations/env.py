@@ -0,0 +1,62 @@
+import asyncio
+import re
+from typing import Any
+
+import models.api_key_model  # noqa: F401
+import models.rollup_model  # noqa: F401
+import models.weather_model  # noqa: F401
+from alembic import context
+from base import Base, create_engine
+from config import config
+from sqlalchemy.engine import Connection
+
+target_metadata = Base.metadata
+
+# Monthly partitions of the weather table (partitions.partition_name) are created at
+# runtime and must never be dropped by an autogenerated migration.
+PARTITION = re.compile(r"weather_p\d{6}")
+
+
+def include_name(name: str | None, type_: str, parent_names: Any) -> bool:
+    """Leave the weather partitions out of autogenerate comparisons."""
+    return not (type_ == "table" and name and PARTITION.fullmatch(name))
+
+
+def run_migrations(connection: Connection) -> None:
+    """Run the migrations through ``connection``."""
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_offline() -> None:
+    """Print the SQL of the migrations instead of running it."""
+    context.configure(
+        url=config.db.url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    """Run the migrations through a connection of their own."""
+    engine = create_engine()
+    async with engine.begin() as connection:
+        await connection.run_sync(run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif context.config.attributes.get("connection") is not None:
+    run_migrations(context.config.attributes["connection"])
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,46 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-06-01 00:00:00
+"""
+
+from typing import Any, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from config import config
+
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # The weather table as create_all built it before migrations existed.
+    # Partitioning is chosen when the schema is created; partitions are
+    # created by `manage.py migrate` and on demand by ingestion.
+    partitioned = config.db.partitioned
+    partition_args: dict[str, Any] = (
+        {"postgresql_partition_by": "RANGE (time_point)"} if partitioned else {}
+    )
+    op.create_table(
+        "weather",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("time_point", sa.DateTime(), nullable=False),
+        sa.Column("temperature", sa.Float(), nullable=False),
+        (
+            sa.PrimaryKeyConstraint("id", "time_point")
+            if partitioned
+            else sa.PrimaryKeyConstraint("id")
+        ),
+        **partition_args,
+    )
+    op.create_index("ix_weather_id", "weather", ["id"])
+    op.create_index("ix_weather_time_point", "weather", ["time_point"])
+
+
+def downgrade() -> None:
+    op.drop_table("weather")
@@ -0,0 +1,39 @@
+"""Unique covering index on weather (city, time_point DESC)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-06-01 00:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Readings stored before ingestion skipped duplicates would break the
+    # unique index; keep the first reading of every city and time.
+    op.execute(
+        "DELETE FROM weather WHERE id NOT IN "
+        "(SELECT MIN(id) FROM weather GROUP BY city, time_point)"
+    )
+    # Databases created before the index was unique have it without the
+    # constraint, so it is always rebuilt.
+    op.drop_index("ix_weather_city_time_point", "weather", if_exists=True)
+    op.create_index(
+        "ix_weather_city_time_point",
+        "weather",
+        ["city", sa.text("time_point DESC")],
+        unique=True,
+        postgresql_include=["temperature", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_weather_city_time_point", "weather")
@@ -0,0 +1,45 @@
+"""Hourly and daily rollup tables
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-06-01 00:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def rollup_table(name: str) -> None:
+    """Create a rollup table summarizing readings per city and bucket."""
+    # Unversioned databases may have the table from create_all already.
+    op.create_table(
+        name,
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("sum_temperature", sa.Float(), nullable=False),
+        sa.Column("min_temperature", sa.Float(), nullable=False),
+        sa.Column("max_temperature", sa.Float(), nullable=False),
+        sa.Column("last_temperature", sa.Float(), nullable=False),
+        sa.Column("last_time_point", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("city", "bucket"),
+        if_not_exists=True,
+    )
+
+
+def upgrade() -> None:
+    # The rollups of existing readings are rebuilt by `manage.py migrate`.
+    rollup_table("weather_hourly")
+    rollup_table("weather_daily")
+
+
+def downgrade() -> None:
+    op.drop_table("weather_daily")
+    op.drop_table("weather_hourly")
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from base import Base
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+
+
+class ApiKey(Base):
+    """
+    ORM model of an API key accepted in the ``x-token`` header.
+
+    Only a SHA-256 digest of the key is stored.
+
+    Attributes:
+        id (int): Primary key identifier.
+        name (str): Owner or purpose of the key.
+        key_hash (str): Hex SHA-256 digest of the key.
+        active (bool): Whether the key is accepted.
+        created_at (datetime): Creation time.
+    """
+
+    __tablename__ = "api_keys"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
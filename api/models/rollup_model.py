@@ -0,0 +1,41 @@
+from base import Base
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+
+class WeatherRollup:
+    """
+    Columns shared by the weather rollup tables.
+
+    Every row summarizes the readings of one city within one bucket.
+
+    Attributes:
+        city (str): City name.
+        bucket (datetime): Start of the bucket.
+        count (int): Number of readings.
+        sum_temperature (float): Sum of the temperatures.
+        min_temperature (float): Lowest temperature.
+        max_temperature (float): Highest temperature.
+        last_temperature (float): Temperature of the newest reading.
+        last_time_point (datetime): Timestamp of the newest reading.
+    """
+
+    city = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False)
+    sum_temperature = Column(Float, nullable=False)
+    min_temperature = Column(Float, nullable=False)
+    max_temperature = Column(Float, nullable=False)
+    last_temperature = Column(Float, nullable=False)
+    last_time_point = Column(DateTime, nullable=False)
+
+
+class WeatherHourly(WeatherRollup, Base):
+    """Hourly rollup of weather readings."""
+
+    __tablename__ = "weather_hourly"
+
+
+class WeatherDaily(WeatherRollup, Base):
+    """Daily rollup of weather readings."""
+
+    __tablename__ = "weather_daily"
@@ -1,5 +1,14 @@
+from typing import Any
+
 from base import Base
-from sqlalchemy import Column, DateTime, Float, Integer, String
+from config import config
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
+
+# Opt-in monthly range partitioning on PostgreSQL. Partitioned tables need
+# the partition key in every unique constraint, so time_point joins the key.
+PARTITION_ARGS: dict[str, Any] = (
+    {"postgresql_partition_by": "RANGE (time_point)"} if config.db.partitioned else {}
+)
 
 
 class Weather(Base):
@@ -14,7 +23,23 @@ class Weather(Base):
     """
 
     __tablename__ = "weather"
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (PARTITION_ARGS,)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     city = Column(String, nullable=False)
-    time_point = Column(DateTime, nullable=False, index=True)
+    time_point = Column(
+        DateTime, nullable=False, index=True, primary_key=config.db.partitioned
+    )
     temperature = Column(Float, nullable=False)
+
+
+# Serves "city = X AND time_point BETWEEN ..." ordered by time descending;
+# on PostgreSQL the remaining columns are included so the lookup is index-only.
+# Unique: a city has one reading per observation time, which lets ingestion
+# skip readings it already stored with ON CONFLICT DO NOTHING.
+Index(
+    "ix_weather_city_time_point",
+    Weather.city,
+    Weather.time_point.desc(),
+    unique=True,
+    postgresql_include=["temperature", "id"],
+)
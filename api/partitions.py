@@ -0,0 +1,100 @@
+import logging
+from datetime import date
+from typing import Iterable
+
+from config import config
+from models.weather_model import Weather
+from sqlalchemy import TextClause, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+
+# Months whose partitions are known to exist, shared by all sessions of the process.
+ensured_partitions: set[date] = set()
+
+
+def month_start(day: date) -> date:
+    """Return the first day of the month containing ``day``."""
+    return date(day.year, day.month, 1)
+
+
+def next_month(month: date) -> date:
+    """Return the first day of the month following ``month``."""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Return the name of the weather partition holding ``month``."""
+    return f"{Weather.__tablename__}_p{month:%Y%m}"
+
+
+def partitioning_enabled(dialect_name: str) -> bool:
+    """Tell whether the weather table is range partitioned on this dialect."""
+    return config.db.partitioned and dialect_name == "postgresql"
+
+
+def create_partition_ddl(month: date) -> TextClause:
+    """Build the DDL creating the partition for ``month`` if it is missing."""
+    return text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+        f"PARTITION OF {Weather.__tablename__} "
+        f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+    )
+
+
+async def ensure_partitions(conn: AsyncConnection, months: Iterable[date]) -> None:
+    """
+    Create missing monthly partitions of the weather table.
+
+    Does nothing unless partitioning is enabled and the connection is
+    PostgreSQL.
+
+    Args:
+        conn (AsyncConnection): Connection with an open transaction.
+        months (Iterable[date]): Days whose months must have a partition.
+    """
+    if not partitioning_enabled(conn.dialect.name):
+        return
+    for month in sorted({month_start(day) for day in months}):
+        logger.info("Ensuring weather partition %s", partition_name(month))
+        await conn.execute(create_partition_ddl(month))
+
+
+async def detach_partition(conn: AsyncConnection, month: date) -> None:
+    """
+    Detach the partition holding ``month`` so it can be archived or dropped.
+
+    Args:
+        conn (AsyncConnection): Connection with an open transaction.
+        month (date): Any day of the month to detach.
+    """
+    if not partitioning_enabled(conn.dialect.name):
+        return
+    name = partition_name(month_start(month))
+    logger.info("Detaching weather partition %s", name)
+    await conn.execute(
+        text(f"ALTER TABLE {Weather.__tablename__} DETACH PARTITION {name}")
+    )
+    ensured_partitions.discard(month_start(month))
+
+
+async def ensure_upcoming_partitions(conn: AsyncConnection) -> list[date]:
+    """
+    Create the weather partitions of the current month and of the
+    ``config.db.partition_months_ahead`` following months.
+
+    Args:
+        conn (AsyncConnection): Connection with an open transaction.
+
+    Returns:
+        list[date]: First days of the months ensured.
+    """
+    months = [month_start(date.today())]
+    for _ in range(config.db.partition_months_ahead):
+        months.append(next_month(months[-1]))
+    await ensure_partitions(conn, months)
+    ensured_partitions.update(months)
+    return months
@@ -0,0 +1,132 @@
+import logging
+from datetime import date, datetime, time, timedelta
+
+from config import config
+from db import DB
+from models.rollup_model import WeatherDaily
+from models.weather_model import Weather
+from partitions import detach_partition, partition_name
+from sqlalchemy import and_, delete, func, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+
+class Retention:
+    """
+    Removal of old raw readings, keeping their rollups.
+
+    Methods:
+        reconcile_rollups(day): Folds raw readings missing from the rollups.
+        delete_raw_day(day, batch_size): Deletes a day of raw readings in batches.
+        drop_raw_month(month): Drops the partition holding a month of readings.
+    """
+
+    def __init__(self, session: AsyncSession):
+        """
+        Initialize the retention helper with a database session.
+
+        Args:
+            session (AsyncSession): SQLAlchemy async session.
+        """
+        self.db_session = session
+
+    async def reconcile_rollups(self, day: date) -> bool:
+        """
+        Make sure the rollups of ``day`` account for all of its raw readings.
+
+        Rollups are only rebuilt when some city has more raw readings than
+        its daily rollup counts, e.g. for data ingested before the rollups
+        existed. A day whose raw readings were partly deleted already is
+        left alone.
+
+        Args:
+            day (date): Day to check.
+
+        Returns:
+            bool: True if the day's rollups were rebuilt.
+        """
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        raw = await self.db_session.execute(
+            select(Weather.city, func.count())
+            .where(and_(Weather.time_point >= start, Weather.time_point < end))
+            .group_by(Weather.city)
+        )
+        rolled = await self.db_session.execute(
+            select(WeatherDaily.city, WeatherDaily.count).where(
+                WeatherDaily.bucket == start
+            )
+        )
+        rolled_counts: dict[str, int] = dict(rolled.tuples().all())
+        if all(count <= rolled_counts.get(city, 0) for city, count in raw):
+            await self.db_session.commit()
+            return False
+
+        logger.info("Rollups of %s are incomplete, rebuilding them.", day)
+        await DB(self.db_session).rebuild_rollups(start, end)
+        return True
+
+    async def delete_raw_day(self, day: date, batch_size: int) -> int:
+        """
+        Delete the raw readings of ``day`` in batches of ``batch_size``.
+
+        Every batch is committed on its own so locks are held only briefly.
+
+        Args:
+            day (date): Day to delete.
+            batch_size (int): Maximum number of rows deleted per transaction.
+
+        Returns:
+            int: Number of deleted rows.
+        """
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        batch = (
+            select(Weather.id)
+            .where(and_(Weather.time_point >= start, Weather.time_point < end))
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        deleted = 0
+        while True:
+            result = await self.db_session.execute(
+                delete(Weather).where(Weather.id.in_(batch))
+            )
+            await self.db_session.commit()
+            count: int = result.rowcount
+            deleted += count
+            if count < batch_size:
+                break
+        logger.info("Deleted %d raw readings of %s.", deleted, day)
+        return deleted
+
+    async def drop_raw_month(self, month: date) -> int:
+        """
+        Detach and drop the partition holding ``month``.
+
+        Only used when the weather table is partitioned; dropping a whole
+        partition avoids deleting its rows one batch at a time.
+
+        Args:
+            month (date): First day of the month to drop.
+
+        Returns:
+            int: Number of raw readings the partition held.
+        """
+        name = partition_name(month)
+        exists = await self.db_session.execute(
+            select(func.to_regclass(literal(name)).is_not(None))
+        )
+        if not exists.scalar_one():
+            await self.db_session.commit()
+            return 0
+        result = await self.db_session.execute(text(f"SELECT count(*) FROM {name}"))
+        count = int(result.scalar_one())
+        await detach_partition(await self.db_session.connection(), month)
+        await self.db_session.execute(text(f"DROP TABLE {name}"))
+        await self.db_session.commit()
+        logger.info("Dropped partition %s with %d raw readings.", name, count)
+        return count
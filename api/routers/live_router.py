@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from typing import AsyncIterator
+
+from config import config
+from dependencies import get_live_hub, verify_live_token
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from live import LiveHub, LiveHubFull, Subscription, sse_events
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+router = APIRouter(dependencies=[Depends(verify_live_token)], tags=["live"])
+
+
+async def subscribe(hub: LiveHub, city: list[str]) -> Subscription:
+    """
+    Subscribe to the live readings of the requested cities.
+
+    Raises:
+        HTTPException: 400 for too many cities, 503 if this process cannot
+            take more subscribers or Redis is unavailable.
+    """
+    cities = list(dict.fromkeys(city))
+    if len(cities) > config.live.max_cities:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {config.live.max_cities} cities per subscription",
+        )
+    try:
+        return await hub.subscribe(cities)
+    except LiveHubFull as e:
+        logger.warning("Rejecting live subscriber: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live subscribers",
+            headers={"Retry-After": "5"},
+        ) from e
+    except RedisError as e:
+        logger.error("Live updates unavailable: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Live updates unavailable",
+        ) from e
+
+
+@router.get(
+    "/live",
+    summary="Receive new weather readings as Server-Sent Events",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "A 'reading' event with a JSON reading per update",
+            "content": {"text/event-stream": {}},
+        },
+        400: {"description": "Too many cities"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Not authenticated"},
+        503: {"description": "No capacity for more subscribers"},
+    },
+)
+async def weather_live(
+    city: list[str] = Query(description="City names"),
+    hub: LiveHub = Depends(get_live_hub),
+) -> StreamingResponse:
+    """
+    Stream the readings of the requested cities as they are stored.
+
+    Each `reading` event carries the newest reading of one city. Updates
+    arriving in quick succession are coalesced, so a city sends at most
+    one event per `LIVE_COALESCE` seconds. Idle streams receive a comment
+    every `LIVE_HEARTBEAT` seconds.
+
+    The token may be passed as the `token` query parameter for clients
+    that cannot set headers, such as `EventSource`.
+    """
+    subscription = await subscribe(hub, city)
+    logger.debug("Live SSE subscriber for %s", sorted(subscription.cities))
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            async for event in sse_events(subscription, config.live.heartbeat):
+                yield event
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/live/ws")
+async def weather_live_ws(
+    websocket: WebSocket,
+    city: list[str] = Query(description="City names"),
+    hub: LiveHub = Depends(get_live_hub),
+) -> None:
+    """
+    Send the readings of the requested cities as JSON text messages as
+    they are stored, coalesced like the SSE endpoint.
+    """
+    subscription = await subscribe(hub, city)
+    await websocket.accept()
+    logger.debug("Live WebSocket subscriber for %s", sorted(subscription.cities))
+
+    async def watch_disconnect() -> None:
+        # Client messages are not used; reading them detects the close.
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while not subscription.closed:
+            for message in await subscription.get(config.live.heartbeat):
+                await websocket.send_text(message.decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(subscription)
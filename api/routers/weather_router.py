@@ -1,12 +1,24 @@
+import base64
+import binascii
 import logging
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, AsyncIterator, Literal, Sequence
 
+import orjson
+from cache import WeatherCache, cache_control, edge_ttl
 from config import config
-from db import DB
-from dependencies import get_db, verify_token
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import JSONResponse
-from schema.wether_schema import WetherSchema
+from db import BUCKET_SECONDS, DB
+from dependencies import get_cache, get_db, get_session_factory, verify_token
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from schema.wether_schema import (
+    WeatherAggregateSchema,
+    WeatherPageSchema,
+    WetherSchema,
+)
+from serializers import SERIALIZERS, dump_json_by_city, dump_json_line, negotiate
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 logger = logging.getLogger(__name__)
 logger.setLevel(config.loglevel)
@@ -15,10 +27,183 @@ logger.addHandler(config.log_handler)
 # Create a router with a global dependency on token verification
 router = APIRouter(dependencies=[Depends(verify_token)], tags=["weather"])
 
+# Upper bound on buckets per city in one aggregate response.
+MAX_BUCKETS = 10_000
+
+# Upper bounds on the cities and the range of one batch request.
+MAX_BATCH_CITIES = 50
+MAX_BATCH_DAYS = 31
+
+
+def encode_cursor(key: tuple[datetime, int]) -> str:
+    """Encode a ``(time_point, id)`` keyset position as an opaque cursor."""
+    time_point, record_id = key
+    raw = f"{time_point.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        time_point, record_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return datetime.fromisoformat(time_point), int(record_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        logger.warning("Invalid cursor: %s", cursor)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        ) from e
+
+
+def check_range(start: datetime, end: datetime) -> None:
+    """
+    Reject empty or inverted ``[start, end)`` ranges.
+
+    Raises:
+        HTTPException: If ``start`` is not before ``end``.
+    """
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'start' must be before 'end'",
+        )
+
+
+def edge_expires(end: datetime) -> dict[str, str]:
+    """
+    Build the header letting nginx cache a response about ``[start, end)``.
+
+    Ranges that ended before today no longer change, so they are cached
+    for the past-day TTL; ranges reaching into today are micro-cached.
+
+    Args:
+        end (datetime): Exclusive end of the range.
+
+    Returns:
+        dict[str, str]: ``X-Accel-Expires`` header.
+    """
+    last_day = (end - timedelta(microseconds=1)).date()
+    return {"X-Accel-Expires": str(edge_ttl(last_day))}
+
+
+def rows_version(rows: Sequence[Any]) -> tuple[datetime | None, int]:
+    """
+    Summarize a day's readings to detect changes.
+
+    Args:
+        rows (Sequence[Any]): Rows of the day, ordered by time descending.
+
+    Returns:
+        tuple[datetime | None, int]: Newest time point (None without
+            readings) and number of readings.
+    """
+    return (rows[0].time_point if rows else None), len(rows)
+
+
+def version_tag(version: tuple[datetime | None, int]) -> str:
+    """
+    Encode the version of a day's readings as a short token.
+
+    Args:
+        version (tuple[datetime | None, int]): Newest time point and number
+            of readings, from ``rows_version``.
+
+    Returns:
+        str: Token that changes whenever a reading is added or removed.
+    """
+    newest, count = version
+    stamp = int(newest.timestamp() * 1_000_000) if newest else 0
+    return f"{count}-{stamp}"
+
+
+def validators(version: tuple[datetime | None, int], variant: str) -> dict[str, str]:
+    """
+    Build the ``ETag`` and ``Last-Modified`` headers of a day's weather.
+
+    The ETag changes whenever a reading of the day is added or removed, and
+    differs between response formats.
+
+    Args:
+        version (tuple[datetime | None, int]): Newest time point and number
+            of readings, from ``rows_version``.
+        variant (str): Response format.
+
+    Returns:
+        dict[str, str]: Validator headers.
+    """
+    newest = version[0]
+    headers = {"ETag": f'W/"{version_tag(version)}-{variant}"'}
+    if newest is not None:
+        headers["Last-Modified"] = format_datetime(
+            newest.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def pack_entry(headers: dict[str, str], payload: bytes) -> bytes:
+    """
+    Store a payload together with its validators in one cache entry.
+
+    Cache hits then answer conditional requests without querying the
+    database. The validators go on the first line, which JSON never spans.
+    """
+    return orjson.dumps(headers) + b"\n" + payload
+
+
+def unpack_entry(entry: bytes) -> tuple[dict[str, str], bytes]:
+    """Split a cache entry built by ``pack_entry`` into validators and payload."""
+    head, _, payload = entry.partition(b"\n")
+    headers: dict[str, str] = orjson.loads(head)
+    return headers, payload
+
+
+def is_conditional(request: Request) -> bool:
+    """Tell whether a request carries ``If-None-Match`` or ``If-Modified-Since``."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def not_modified(request: Request, headers: dict[str, str]) -> bool:
+    """
+    Check the conditional headers of a request against the validators.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since``, which is
+    only used when the client sent no ETag.
+
+    Args:
+        request (Request): Incoming request.
+        headers (dict[str, str]): Validators of the current data.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or headers["ETag"].removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
+
 
 @router.get(
     "/",
     summary="Get weather data",
+    response_model=list[WetherSchema],
     response_description="List of weather records for a specific city and date",
     response_class=JSONResponse,
     responses={
@@ -34,20 +219,26 @@ router = APIRouter(dependencies=[Depends(verify_token)], tags=["weather"])
                             "temperature": 21.5,
                         }
                     ]
-                }
+                },
+                "application/msgpack": {},
+                "application/vnd.apache.arrow.stream": {},
             },
         },
+        304: {"description": "Not modified since the client's copy"},
         401: {"description": "Unauthorized"},
         403: {"description": "Not authenticated"},
+        406: {"description": "None of the accepted formats is available"},
     },
 )
 async def weather(
+    request: Request,
     city: str = Query(default="Kyiv", description="City name"),
     day: date = Query(
         default_factory=date.today, description="Date in YYYY-MM-DD format"
     ),
     db: DB = Depends(get_db),
-) -> list[WetherSchema] | None:
+    cache: WeatherCache = Depends(get_cache),
+) -> Response:
     """
     Retrieve weather data for a specified city and day.
 
@@ -55,11 +246,267 @@ async def weather(
     - **day**: Date to filter weather records (default is today)
 
     Returns a list of weather entries matching the criteria.
+    Responses are served from the Redis cache when available.
+
+    Responses carry an `ETag` and a `Last-Modified` header. Send them back
+    as `If-None-Match` / `If-Modified-Since` to get `304 Not Modified`
+    while no reading was added. Past days may be cached for
+    `CACHE_HTTP_PAST_MAX_AGE` seconds; the current day must be revalidated.
+
+    The format follows the `Accept` header: JSON by default, or columnar
+    MessagePack (`application/msgpack`) and Arrow IPC stream
+    (`application/vnd.apache.arrow.stream`) when their packages are installed.
+    """
+    logger.debug("Received weather data request for city: %s, date: %s", city, day)
+    serializer = negotiate(request.headers.get("accept"))
+    if serializer is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"Supported formats: {', '.join(SERIALIZERS)}",
+        )
+
+    async def load() -> bytes:
+        rows = await db.get_weather_rows(city, day)
+        logger.debug("Fetched %d weather records for %s on %s.", len(rows), city, day)
+        return pack_entry(
+            validators(rows_version(rows), serializer.name), serializer.dump(rows)
+        )
+
+    base_headers = {
+        "Vary": "Accept",
+        "Cache-Control": cache_control(day),
+        "X-Accel-Expires": str(edge_ttl(day)),
+    }
+    entry = None
+    if is_conditional(request):
+        entry = await cache.get(city, day, variant=serializer.name)
+        if entry is None:
+            # Revalidate a client's copy from the index alone: the rows are
+            # only read and serialized when they changed.
+            version = await db.get_weather_version(city, day)
+            headers = {**base_headers, **validators(version, serializer.name)}
+            if not_modified(request, headers):
+                logger.debug("Weather of %s on %s not modified.", city, day)
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+                )
+
+    # The validators are cached with the payload they describe, so they are
+    # never newer or older than the body. Ingestion invalidates the entry.
+    if entry is None:
+        entry = await cache.get_or_load(city, day, load, variant=serializer.name)
+    validator_headers, payload = unpack_entry(entry)
+    headers = {**base_headers, **validator_headers}
+    if not_modified(request, headers):
+        logger.debug("Weather of %s on %s not modified.", city, day)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=payload, media_type=serializer.media_type, headers=headers)
+
+
+@router.get(
+    "/range",
+    summary="Get weather data for a date range, page by page",
+    response_model=WeatherPageSchema,
+    responses={
+        400: {"description": "Invalid range or cursor"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Not authenticated"},
+    },
+)
+async def weather_range(
+    response: Response,
+    city: str = Query(default="Kyiv", description="City name"),
+    start: datetime = Query(description="Inclusive start of the range"),
+    end: datetime = Query(description="Exclusive end of the range"),
+    limit: int = Query(default=100, ge=1, le=1000, description="Page size"),
+    cursor: str | None = Query(
+        default=None, description="Cursor returned as 'next_cursor' by the last page"
+    ),
+    db: DB = Depends(get_db),
+) -> WeatherPageSchema:
+    """
+    Retrieve weather data for a city within ``[start, end)``, newest first.
+
+    - **limit**: Maximum number of records per page
+    - **cursor**: Pass the previous page's `next_cursor` to get the next page
+
+    `next_cursor` is null on the last page.
+    """
+    check_range(start, end)
+    after = decode_cursor(cursor) if cursor else None
+    logger.debug(
+        "Received weather range request for city: %s, [%s, %s)", city, start, end
+    )
+
+    items, next_key = await db.get_weather_page(city, start, end, limit, after)
+    response.headers.update(edge_expires(end))
+    return WeatherPageSchema(
+        items=items,
+        next_cursor=encode_cursor(next_key) if next_key else None,
+    )
+
+
+@router.get(
+    "/batch",
+    summary="Get weather data of several cities for a date range",
+    response_model=dict[str, list[WetherSchema]],
+    response_class=Response,
+    responses={
+        200: {
+            "description": "Weather records of every requested city",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "Kyiv": [
+                            {
+                                "temperature": 21.5,
+                                "city": "Kyiv",
+                                "time_point": "2025-05-08T14:00:00",
+                                "id": 1,
+                            }
+                        ],
+                        "Lviv": [],
+                    }
+                }
+            },
+        },
+        400: {"description": "Invalid range, too many cities or days"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Not authenticated"},
+    },
+)
+async def weather_batch(
+    city: list[str] = Query(description="City names"),
+    start: datetime = Query(description="Inclusive start of the range"),
+    end: datetime = Query(description="Exclusive end of the range"),
+    db: DB = Depends(get_db),
+) -> Response:
+    """
+    Retrieve weather data for several cities within ``[start, end)``.
+
+    All cities are read with a single query. The response maps every
+    requested city to its records, newest first; cities without data map
+    to an empty list.
+
+    - **city**: Repeat the parameter for every city (at most 50)
+    - **start**, **end**: The range may span at most 31 days
     """
-    logger.info("Received weather data request for city: %s, date: %s", city, day)
+    check_range(start, end)
+    cities = list(dict.fromkeys(city))
+    if len(cities) > MAX_BATCH_CITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_CITIES} cities per request",
+        )
+    if end - start > timedelta(days=MAX_BATCH_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {MAX_BATCH_DAYS} days",
+        )
+    logger.debug(
+        "Received weather batch request for cities: %s, [%s, %s)", cities, start, end
+    )
+
+    rows = await db.get_weather_batch(cities, start, end)
+    return Response(
+        content=dump_json_by_city(cities, rows),
+        media_type="application/json",
+        headers=edge_expires(end),
+    )
+
+
+@router.get(
+    "/stream",
+    summary="Stream weather data for a date range as NDJSON",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One JSON weather record per line",
+            "content": {"application/x-ndjson": {}},
+        },
+        400: {"description": "Invalid range"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Not authenticated"},
+    },
+)
+async def weather_stream(
+    city: str = Query(default="Kyiv", description="City name"),
+    start: datetime = Query(description="Inclusive start of the range"),
+    end: datetime = Query(description="Exclusive end of the range"),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> StreamingResponse:
+    """
+    Stream weather data for a city within ``[start, end)``, newest first.
+
+    Records are read from a server-side cursor and written as they arrive,
+    so arbitrarily large ranges are served in constant memory.
+    """
+    check_range(start, end)
+    logger.debug(
+        "Received weather stream request for city: %s, [%s, %s)", city, start, end
+    )
+
+    async def lines() -> AsyncIterator[bytes]:
+        # The session must outlive the handler, so it is opened here.
+        async with session_factory() as session:
+            async for row in DB(session).stream_weather(city, start, end):
+                yield dump_json_line(row)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/aggregate",
+    summary="Get aggregated weather statistics per time bucket",
+    response_model=WeatherAggregateSchema,
+    responses={
+        400: {"description": "Invalid range or too many buckets"},
+        401: {"description": "Unauthorized"},
+        403: {"description": "Not authenticated"},
+    },
+)
+async def weather_aggregate(
+    response: Response,
+    city: list[str] = Query(default=["Kyiv"], description="City names"),
+    start: datetime = Query(description="Inclusive start of the range"),
+    end: datetime = Query(description="Exclusive end of the range"),
+    bucket: Literal["5m", "1h", "1d"] = Query(default="1h", description="Bucket"),
+    percentile: list[float] = Query(
+        default=[], description="Percentiles to compute, as fractions (e.g. 0.95)"
+    ),
+    db: DB = Depends(get_db),
+) -> WeatherAggregateSchema:
+    """
+    Retrieve min/max/avg/count and optional percentiles of the temperature
+    per time bucket for one or more cities within ``[start, end)``.
+
+    The response is columnar: for every city, `time` holds the bucket starts
+    and every statistic is a list aligned with it.
+    """
+    check_range(start, end)
+    bucket_seconds = BUCKET_SECONDS[bucket]
+    if (end - start).total_seconds() / bucket_seconds > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {MAX_BUCKETS} buckets",
+        )
+    if any(not 0 <= p <= 1 for p in percentile):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Percentiles must be between 0 and 1",
+        )
+    cities = list(dict.fromkeys(city))
+    logger.debug(
+        "Received weather aggregate request for cities: %s, [%s, %s) by %s",
+        cities,
+        start,
+        end,
+        bucket,
+    )
 
-    weather_data = await db.get_weather(city, day)
-    logger.info(
-        "Fetched %d weather records for %s on %s.", len(weather_data), city, day
+    series = await db.aggregate_weather(
+        cities, start, end, bucket_seconds, list(dict.fromkeys(percentile))
     )
-    return weather_data
+    response.headers.update(edge_expires(end))
+    return WeatherAggregateSchema(bucket=bucket, cities=series)
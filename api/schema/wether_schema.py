@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class WetherSchema(BaseModel):
@@ -9,3 +9,24 @@ class WetherSchema(BaseModel):
     time_point: datetime
     id: int | None = None
     model_config = ConfigDict(from_attributes=True)
+
+
+class WeatherPageSchema(BaseModel):
+    items: list[WetherSchema]
+    next_cursor: str | None = None
+
+
+class WeatherSeriesSchema(BaseModel):
+    """Columnar per-bucket statistics of one city; all lists are aligned."""
+
+    time: list[datetime] = Field(default_factory=list)
+    count: list[int] = Field(default_factory=list)
+    min: list[float] = Field(default_factory=list)
+    max: list[float] = Field(default_factory=list)
+    avg: list[float] = Field(default_factory=list)
+    percentiles: dict[str, list[float]] = Field(default_factory=dict)
+
+
+class WeatherAggregateSchema(BaseModel):
+    bucket: str
+    cities: dict[str, WeatherSeriesSchema]
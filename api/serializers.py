@@ -0,0 +1,167 @@
+from importlib.util import find_spec
+from typing import Any, Callable, NamedTuple, Sequence
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+# pyarrow takes long to import, so it is only loaded by the first Arrow
+# response instead of by every worker at startup.
+ARROW_AVAILABLE = find_spec("pyarrow") is not None
+
+# Response columns, in the order of WetherSchema.
+COLUMNS = ("temperature", "city", "time_point", "id")
+
+
+class Serializer(NamedTuple):
+    """A response format for lists of weather rows."""
+
+    name: str
+    media_type: str
+    dump: Callable[[Sequence[Any]], bytes]
+
+
+def dump_json(rows: Sequence[Any]) -> bytes:
+    """
+    Serialize rows to a JSON list of objects with orjson.
+
+    The output matches ``list[WetherSchema]`` without validating every row.
+    """
+    return orjson.dumps(
+        [
+            {
+                "temperature": row.temperature,
+                "city": row.city,
+                "time_point": row.time_point,
+                "id": row.id,
+            }
+            for row in rows
+        ]
+    )
+
+
+def dump_json_by_city(cities: Sequence[str], rows: Sequence[Any]) -> bytes:
+    """
+    Serialize rows to a JSON object mapping every city to its list of rows.
+
+    The output matches ``dict[str, list[WetherSchema]]``; cities without
+    rows map to an empty list.
+    """
+    grouped: dict[str, list[dict[str, Any]]] = {city: [] for city in cities}
+    for row in rows:
+        grouped[row.city].append(
+            {
+                "temperature": row.temperature,
+                "city": row.city,
+                "time_point": row.time_point,
+                "id": row.id,
+            }
+        )
+    return orjson.dumps(grouped)
+
+
+def dump_json_line(row: Any) -> bytes:
+    """Serialize a single row as one NDJSON line."""
+    return orjson.dumps(
+        {
+            "temperature": row.temperature,
+            "city": row.city,
+            "time_point": row.time_point,
+            "id": row.id,
+        },
+        option=orjson.OPT_APPEND_NEWLINE,
+    )
+
+
+def dump_msgpack(rows: Sequence[Any]) -> bytes:
+    """Serialize rows to a MessagePack map of columns."""
+    columns: dict[str, list[Any]] = {name: [] for name in COLUMNS}
+    for row in rows:
+        columns["temperature"].append(row.temperature)
+        columns["city"].append(row.city)
+        columns["time_point"].append(row.time_point.isoformat())
+        columns["id"].append(row.id)
+    packed: bytes = msgpack.packb(columns)
+    return packed
+
+
+def dump_arrow(rows: Sequence[Any]) -> bytes:
+    """Serialize rows to an Arrow IPC stream holding one record batch."""
+    import pyarrow
+    import pyarrow.ipc
+
+    table = pyarrow.table(
+        {
+            "temperature": pyarrow.array(
+                [row.temperature for row in rows], pyarrow.float64()
+            ),
+            "city": pyarrow.array([row.city for row in rows], pyarrow.string()),
+            "time_point": pyarrow.array(
+                [row.time_point for row in rows], pyarrow.timestamp("us")
+            ),
+            "id": pyarrow.array([row.id for row in rows], pyarrow.int64()),
+        }
+    )
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return bytes(sink.getvalue().to_pybytes())
+
+
+JSON = Serializer("json", "application/json", dump_json)
+
+# Available formats by media type; optional ones need their package installed.
+SERIALIZERS: dict[str, Serializer] = {JSON.media_type: JSON}
+if msgpack is not None:
+    SERIALIZERS["application/msgpack"] = Serializer(
+        "msgpack", "application/msgpack", dump_msgpack
+    )
+    SERIALIZERS["application/x-msgpack"] = SERIALIZERS["application/msgpack"]
+if ARROW_AVAILABLE:
+    SERIALIZERS["application/vnd.apache.arrow.stream"] = Serializer(
+        "arrow", "application/vnd.apache.arrow.stream", dump_arrow
+    )
+
+VARIANTS = tuple(sorted({serializer.name for serializer in SERIALIZERS.values()}))
+
+
+def negotiate(accept: str | None) -> Serializer | None:
+    """
+    Pick the response format from an ``Accept`` header.
+
+    Media ranges are tried by descending quality; wildcards and a missing
+    header select JSON.
+
+    Args:
+        accept (str | None): Value of the ``Accept`` header.
+
+    Returns:
+        Serializer | None: Chosen format, or None if nothing acceptable is
+            available.
+    """
+    if not accept:
+        return JSON
+
+    ranges = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            ranges.append((-quality, position, media_type.lower()))
+
+    for _, _, media_type in sorted(ranges):
+        if media_type in SERIALIZERS:
+            return SERIALIZERS[media_type]
+        if media_type in ("*/*", "application/*"):
+            return JSON
+    return None
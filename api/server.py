@@ -0,0 +1,94 @@
+import logging
+import math
+import os
+from pathlib import Path
+
+from config import config
+from uvicorn_worker import UvicornWorker
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cpu_quota(root: Path = CGROUP_ROOT) -> float | None:
+    """
+    Read the CPU limit of the container from its cgroup.
+
+    Both cgroup v2 (``cpu.max``) and v1 (``cpu.cfs_quota_us``) are read.
+
+    Args:
+        root (Path): Mount point of the cgroup filesystem.
+
+    Returns:
+        float | None: Number of CPUs the container may use, None if it is
+            not limited.
+    """
+    try:
+        quota, period = (root / "cpu.max").read_text().split()
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = (root / "cpu" / "cpu.cfs_quota_us").read_text().strip()
+        period = (root / "cpu" / "cpu.cfs_period_us").read_text().strip()
+        if int(quota) <= 0:
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> float:
+    """
+    Count the CPUs this process may use.
+
+    ``os.cpu_count()`` reports the CPUs of the host, not the quota of the
+    container, so the smaller of the cgroup quota and the CPU affinity is
+    used.
+
+    Args:
+        root (Path): Mount point of the cgroup filesystem.
+
+    Returns:
+        float: Available CPUs, possibly fractional.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = float(len(os.sched_getaffinity(0)))
+    else:
+        cpus = float(os.cpu_count() or 1)
+    quota = cpu_quota(root)
+    return min(cpus, quota) if quota else cpus
+
+
+def worker_count(root: Path = CGROUP_ROOT) -> int:
+    """
+    Choose the number of gunicorn workers.
+
+    ``config.server.workers`` wins when set; otherwise every available CPU
+    gets ``config.server.workers_per_cpu`` workers, at least one and at most
+    ``config.server.max_workers``. Async workers do not block on I/O, so
+    more workers than CPUs only add context switches and DB connections.
+
+    Args:
+        root (Path): Mount point of the cgroup filesystem.
+
+    Returns:
+        int: Number of workers.
+    """
+    server = config.server
+    if server.workers > 0:
+        return server.workers
+    cpus = available_cpus(root)
+    workers = math.ceil(cpus * server.workers_per_cpu)
+    return max(1, min(server.max_workers, workers))
+
+
+class Worker(UvicornWorker):
+    """Uvicorn worker using the event loop and HTTP parser of ``config.server``."""
+
+    CONFIG_KWARGS = {"loop": config.server.loop, "http": config.server.http}
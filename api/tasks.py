@@ -1,11 +1,21 @@
-import asyncio
 import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any
 
-import httpx
-from base import async_session
-from celery import Celery
+from cache import WeatherCache
+from celery import Celery, Task
+from celery.signals import task_failure, task_postrun, task_prerun
 from config import config
-from db import DB
+from db import DB, WeatherReading
+from ingest import ReadingStream
+from live import LivePublisher
+from metrics import TASK_DURATION, TASK_FAILURES
+from partitions import month_start, next_month, partitioning_enabled
+from retention import Retention
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from upstream import UpstreamClient
+from worker_runtime import runtime
 
 logger = logging.getLogger(__name__)
 logger.setLevel(config.loglevel)
@@ -18,14 +28,32 @@ celery_app = Celery(
 )
 
 
-def get_data_from_resp(resp: httpx.Response) -> float:
-    """
-    Extract temperature data from the API response.
-    """
-    resp_json = resp.json()
-    temp = resp_json["current"]["temp_c"]
-    logger.info("Extracted temperature: %.2f°C", temp)
-    return float(temp)
+# Start times of the tasks running in this process, by task id.
+_task_started: dict[str, float] = {}
+
+
+@task_prerun.connect  # type: ignore[misc]
+def start_task_timer(task_id: str, **kwargs: Any) -> None:
+    """Remember when a task started."""
+    _task_started[task_id] = time.monotonic()
+
+
+@task_postrun.connect  # type: ignore[misc]
+def observe_task(
+    task_id: str, task: Task, state: str | None = None, **kwargs: Any
+) -> None:
+    """Record the duration of a finished task by its final state."""
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+            time.monotonic() - started
+        )
+
+
+@task_failure.connect  # type: ignore[misc]
+def count_task_failure(sender: Task, **kwargs: Any) -> None:
+    """Count a task that raised an exception."""
+    TASK_FAILURES.labels(sender.name).inc()
 
 
 @celery_app.task  # type: ignore[misc]
@@ -34,33 +62,72 @@ def fetch_and_store_data() -> None:
     Celery task to fetch and store weather data.
     """
     logger.info("Starting fetch_and_store_data task")
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(_fetch_and_store_data_async())
+    runtime.run(
+        lambda resources: _fetch_and_store_data_async(
+            resources.upstream,
+            resources.session_factory,
+            resources.cache,
+            resources.stream if config.ingest.write_behind else None,
+            resources.publisher,
+        )
+    )
 
 
-async def _fetch_and_store_data_async() -> None:
+async def _fetch_and_store_data_async(
+    upstream: UpstreamClient,
+    session_factory: async_sessionmaker[AsyncSession],
+    cache: WeatherCache,
+    stream: ReadingStream | None = None,
+    publisher: LivePublisher | None = None,
+) -> None:
     """
     Asynchronous function to fetch weather data and store it in the database.
+
+    Observations the provider has not updated since the last stored one are
+    skipped, so a run may legitimately store nothing. Readings are stamped
+    with the provider's observation time and stored with duplicates
+    skipped, so a retried or overlapping run does not store an observation
+    twice.
+
+    With a ``stream`` (write-behind ingestion) the readings are only
+    appended to it; the flusher stores them in large batches, invalidates
+    the cache and announces them.
+
+    Args:
+        upstream (UpstreamClient): Client of the weather provider.
+        session_factory (async_sessionmaker[AsyncSession]): Database sessions.
+        cache (WeatherCache): Cache to invalidate for the stored days.
+        stream (ReadingStream | None): Ingestion stream, if readings are
+            written behind.
+        publisher (LivePublisher | None): Announces newly stored readings
+            to live subscribers.
     """
-    logger.info("Fetching weather data from external API...")
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            response = await client.get(config.extapi.url())
-            response.raise_for_status()
-            logger.info("Received weather data successfully.")
-        except httpx.RequestError as e:
-            logger.error("Error occurred while acquiring DB session: %s", e)
-            raise
+    cities = config.extapi.cities
+    logger.info("Fetching weather data for %d cities...", len(cities))
+    observations = await upstream.fetch_many(cities)
+    if not observations:
+        return
 
-    async with async_session() as session:
+    now = datetime.now()
+    readings = [
+        WeatherReading(o.city, o.temperature, o.observed_at or now)
+        for o in observations
+    ]
+
+    if stream is not None:
+        backlog = await stream.append(readings)
+        upstream.mark_stored(observations)
+        logger.info(
+            "Queued %d readings for storage (backlog %d).", len(readings), backlog
+        )
+        return
+
+    async with session_factory() as session:
         try:
             db = DB(session)
-            temperature = get_data_from_resp(response)
-            await db.set_weather(config.extapi.city, temperature)
-            await session.commit()
+            inserted = await db.store_new_weather(readings)
             logger.info(
-                "Weather data for %s saved to the database.", config.extapi.city
+                "Weather data for %d cities saved to the database.", len(inserted)
             )
 
         except Exception as e:
@@ -68,7 +135,91 @@ async def _fetch_and_store_data_async() -> None:
             logger.error("Failed to store weather data: %s", e)
             raise
 
+    upstream.mark_stored(observations)
+
+    await cache.invalidate((r.city, r.time_point.date()) for r in readings)
+    if publisher is not None and inserted:
+        await publisher.publish(inserted)
+
+
+@celery_app.task  # type: ignore[misc]
+def apply_retention() -> dict[str, float]:
+    """
+    Celery task deleting raw weather readings older than the retention window.
+    """
+    logger.info("Starting apply_retention task")
+    return runtime.run(
+        lambda resources: _apply_retention_async(resources.session_factory)
+    )
+
+
+async def _apply_retention_async(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> dict[str, float]:
+    """
+    Delete raw readings older than ``config.retention.raw_days`` days.
+
+    Before a day is deleted its readings are folded into the hourly and
+    daily rollups if they are not accounted for yet, so the coarse history
+    survives. Rows are deleted in batches of ``config.retention.batch_size``,
+    or whole monthly partitions are dropped when the table is partitioned.
+
+    Args:
+        session_factory (async_sessionmaker[AsyncSession]): Database sessions.
+
+    Returns:
+        dict[str, float]: Deleted rows, days whose rollups were rebuilt and
+            elapsed seconds.
+    """
+    started = time.monotonic()
+    deleted = rebuilt = 0
+    if config.retention.raw_days <= 0:
+        logger.info("Raw data retention is disabled.")
+        return {"deleted": 0, "rebuilt_days": 0, "seconds": 0.0}
+
+    cutoff = date.today() - timedelta(days=config.retention.raw_days)
+    async with session_factory() as session:
+        retention = Retention(session)
+        oldest = await DB(session).oldest_time_point()
+        day = oldest.date() if oldest else cutoff
+        connection = await session.connection()
+        partitioned = partitioning_enabled(connection.dialect.name)
+        logger.info("Applying retention to raw readings in [%s, %s)", day, cutoff)
+
+        while day < cutoff:
+            month = month_start(day)
+            if partitioned and next_month(month) <= cutoff:
+                while day < next_month(month):
+                    rebuilt += await retention.reconcile_rollups(day)
+                    day += timedelta(days=1)
+                deleted += await retention.drop_raw_month(month)
+                continue
+
+            rebuilt += await retention.reconcile_rollups(day)
+            deleted += await retention.delete_raw_day(day, config.retention.batch_size)
+            day += timedelta(days=1)
+
+    report = {
+        "deleted": deleted,
+        "rebuilt_days": rebuilt,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    logger.info(
+        "Retention removed %d raw readings (%d days re-rolled) in %.3fs.",
+        report["deleted"],
+        report["rebuilt_days"],
+        report["seconds"],
+    )
+    return report
+
 
 if __name__ == "__main__":
     logger.info("Starting weather fetch and store process...")
-    asyncio.run(_fetch_and_store_data_async())
+    try:
+        runtime.run(
+            lambda resources: _fetch_and_store_data_async(
+                resources.upstream, resources.session_factory, resources.cache
+            )
+        )
+    finally:
+        runtime.close()
@@ -0,0 +1,380 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable, NamedTuple
+
+import httpx
+from config import config
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+# Statuses worth retrying: the provider is overloaded or briefly unavailable.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamError(Exception):
+    """The weather provider could not be queried."""
+
+
+class CircuitOpenError(UpstreamError):
+    """Calls are suspended after repeated provider failures."""
+
+
+class Observation(NamedTuple):
+    """
+    Current weather reported by the provider for a city.
+
+    Attributes:
+        city (str): City name.
+        temperature (float): Temperature in °C.
+        last_updated (str | None): Provider's observation version, e.g.
+            ``last_updated_epoch``.
+        etag (str | None): ETag of the response, if the provider sent one.
+        observed_at (datetime | None): Local time of the observation, from
+            ``last_updated_epoch``.
+    """
+
+    city: str
+    temperature: float
+    last_updated: str | None = None
+    etag: str | None = None
+    observed_at: datetime | None = None
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider for a while.
+
+    After ``threshold`` consecutive failures the circuit opens and calls fail
+    immediately for ``reset_timeout`` seconds. Then a single trial call is let
+    through (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds before a trial call is allowed.
+            clock (Callable[[], float]): Monotonic time source.
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half-open``."""
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def release(self) -> None:
+        """End a trial call that neither succeeded nor failed, e.g. cancelled."""
+        self._trial = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit at the threshold."""
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.threshold or self.opened_at is not None:
+            if self.opened_at is None:
+                logger.warning(
+                    "Weather provider failed %d times, pausing calls for %.0fs.",
+                    self.failures,
+                    self.reset_timeout,
+                )
+            self.opened_at = self.clock()
+
+
+class RateBudget:
+    """
+    Token bucket limiting the request rate to the provider.
+
+    Callers wait for a token instead of being rejected.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            rate (float): Requests per second, 0 for no limit.
+            burst (int): Requests that may be made at once.
+            clock (Callable[[], float]): Monotonic time source.
+            sleep (Callable[[float], Awaitable[None]]): Sleep function.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.burst)
+        self.updated = clock()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be made and spend its token."""
+        if self.rate <= 0:
+            return
+        while True:
+            now = self.clock()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await self.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff(attempt: int, base: float, cap: float) -> float:
+    """
+    Full-jitter exponential backoff.
+
+    Args:
+        attempt (int): Number of the failed attempt, from 0.
+        base (float): Delay scale in seconds.
+        cap (float): Maximum delay in seconds.
+
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def create_http_client(
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """
+    Create the pooled HTTP client used to call the weather provider.
+
+    Connections are kept alive between tasks, over HTTP/2 when
+    ``config.extapi.http2`` is set (requires the ``h2`` package).
+
+    Args:
+        transport (httpx.AsyncBaseTransport | None): Custom transport, for tests.
+
+    Returns:
+        httpx.AsyncClient: Client with ``config.extapi`` timeouts and limits.
+    """
+    extapi = config.extapi
+    limits = httpx.Limits(
+        max_connections=extapi.concurrency,
+        max_keepalive_connections=extapi.concurrency,
+    )
+    timeout = httpx.Timeout(extapi.timeout, connect=extapi.connect_timeout)
+    return httpx.AsyncClient(
+        timeout=timeout, limits=limits, http2=extapi.http2, transport=transport
+    )
+
+
+class UpstreamClient:
+    """
+    Client of the weather provider configured in ``config.extapi``.
+
+    Bounds the requests in flight and their rate, retries transient
+    failures with jittered exponential backoff, trips a circuit breaker on
+    repeated failures, and skips observations that were already stored.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        breaker: CircuitBreaker | None = None,
+        budget: RateBudget | None = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            client (httpx.AsyncClient): Pooled HTTP client.
+            breaker (CircuitBreaker | None): Breaker, from the config by default.
+            budget (RateBudget | None): Rate budget, from the config by default.
+            sleep (Callable[[float], Awaitable[None]]): Sleep between retries.
+        """
+        extapi = config.extapi
+        self.client = client
+        self.breaker = breaker or CircuitBreaker(
+            extapi.breaker_threshold, extapi.breaker_reset
+        )
+        self.budget = budget or RateBudget(extapi.rate_limit, extapi.concurrency)
+        self.semaphore = asyncio.Semaphore(extapi.concurrency)
+        self.sleep = sleep
+        # Last stored observation version and ETag of every city.
+        self.stored: dict[str, tuple[str | None, str | None]] = {}
+
+    async def aclose(self) -> None:
+        """Close the HTTP client."""
+        await self.client.aclose()
+
+    async def fetch(self, city: str) -> Observation | None:
+        """
+        Fetch the current weather of a city.
+
+        Args:
+            city (str): City name.
+
+        Returns:
+            Observation | None: New observation, or None if it is the one
+                already stored.
+
+        Raises:
+            CircuitOpenError: The circuit is open.
+            UpstreamError: The request failed after all retries.
+        """
+        last_updated, etag = self.stored.get(city, (None, None))
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await self._get(config.extapi.url(city), headers)
+        if response.status_code == 304:
+            return None
+
+        current = response.json()["current"]
+        epoch = current.get("last_updated_epoch")
+        version = current.get("last_updated") if epoch is None else epoch
+        version = None if version is None else str(version)
+        if version is not None and version == last_updated:
+            logger.debug("Observation of %s unchanged since %s", city, version)
+            return None
+        return Observation(
+            city,
+            float(current["temp_c"]),
+            version,
+            response.headers.get("etag"),
+            None if epoch is None else datetime.fromtimestamp(int(epoch)),
+        )
+
+    async def _get(self, url: str, headers: dict[str, str]) -> httpx.Response:
+        """
+        GET ``url`` with retries, within the concurrency and rate limits.
+
+        Returns:
+            httpx.Response: Successful or 304 response.
+        """
+        extapi = config.extapi
+        attempt = 0
+        while True:
+            trial = self.breaker.state == "half-open"
+            if not self.breaker.allow():
+                raise CircuitOpenError("Weather provider circuit is open")
+
+            delay = backoff(attempt, extapi.backoff_base, extapi.backoff_max)
+            try:
+                async with self.semaphore:
+                    await self.budget.acquire()
+                    response = await self.client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                error: Exception = e
+            else:
+                if response.status_code < 400:
+                    self.breaker.record_success()
+                    return response
+                error = UpstreamError(f"Provider answered {response.status_code}")
+                if response.status_code not in RETRY_STATUSES:
+                    # The request itself is wrong (e.g. unknown city), the
+                    # provider is fine.
+                    self.breaker.record_success()
+                    raise error
+                retry_after = response.headers.get("retry-after", "")
+                if retry_after.isdigit():
+                    delay = min(float(retry_after), extapi.backoff_max)
+            finally:
+                # A trial ended by any other exception or by cancellation
+                # must not keep the circuit half-open for good.
+                if trial:
+                    self.breaker.release()
+
+            self.breaker.record_failure()
+            if attempt >= extapi.retries:
+                raise UpstreamError(str(error)) from error
+            logger.debug("Retrying %s in %.2fs after: %s", url, delay, error)
+            await self.sleep(delay)
+            attempt += 1
+
+    async def fetch_many(self, cities: Iterable[str]) -> list[Observation]:
+        """
+        Fetch several cities concurrently, skipping failed and unchanged ones.
+
+        Args:
+            cities (Iterable[str]): City names.
+
+        Returns:
+            list[Observation]: New observations.
+
+        Raises:
+            UpstreamError: No city could be fetched.
+        """
+        cities = list(cities)
+        results = await asyncio.gather(
+            *(self.fetch(city) for city in cities), return_exceptions=True
+        )
+
+        observations = []
+        unchanged = failed = 0
+        for city, result in zip(cities, results):
+            if isinstance(result, BaseException):
+                logger.error("Failed to fetch weather for %s: %s", city, result)
+                failed += 1
+            elif result is None:
+                unchanged += 1
+            else:
+                observations.append(result)
+        logger.info(
+            "Fetched %d new observations (%d unchanged) for %d cities.",
+            len(observations),
+            unchanged,
+            len(cities),
+        )
+        if cities and failed == len(cities):
+            raise UpstreamError("No weather data was fetched.")
+        return observations
+
+    def mark_stored(self, observations: Iterable[Observation]) -> None:
+        """
+        Remember stored observations so unchanged ones are skipped next time.
+
+        Args:
+            observations (Iterable[Observation]): Observations just stored.
+        """
+        for observation in observations:
+            self.stored[observation.city] = (
+                observation.last_updated,
+                observation.etag,
+            )
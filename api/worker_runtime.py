@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Coroutine, NamedTuple, TypeVar
+
+from base import create_engine
+from cache import WeatherCache, create_cache
+from celery.signals import (
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+    worker_shutdown,
+)
+from config import config
+from ingest import ReadingStream, create_stream
+from live import LivePublisher
+from metrics import mark_process_dead, registry, reset_multiproc_dir
+from prometheus_client import start_http_server
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from upstream import UpstreamClient, create_http_client
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.loglevel)
+logger.addHandler(config.log_handler)
+
+T = TypeVar("T")
+
+
+class WorkerResources(NamedTuple):
+    """Long-lived resources owned by a worker process."""
+
+    loop: asyncio.AbstractEventLoop
+    upstream: UpstreamClient
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    cache: WeatherCache
+    stream: ReadingStream
+    publisher: LivePublisher
+
+
+class WorkerRuntime:
+    """
+    Event loop, upstream client, database engine, cache, ingestion stream
+    and live update publisher of a worker process.
+
+    The resources are created once per process (on ``worker_process_init``,
+    or lazily on the first task when the worker runs without a process pool)
+    and reused by every task, so connections to the weather provider,
+    PostgreSQL and Redis survive between runs. They are released on worker
+    shutdown.
+    """
+
+    def __init__(self) -> None:
+        self._resources: WorkerResources | None = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the resources of this process have been created."""
+        return self._resources is not None
+
+    def start(self) -> WorkerResources:
+        """
+        Create the resources of this process unless they already exist.
+
+        Returns:
+            WorkerResources: Resources shared by the tasks of this process.
+        """
+        if self._resources is not None:
+            return self._resources
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        engine = create_engine()
+        stream = create_stream()
+        self._resources = WorkerResources(
+            loop=loop,
+            upstream=UpstreamClient(create_http_client()),
+            engine=engine,
+            session_factory=async_sessionmaker(engine, class_=AsyncSession),
+            cache=create_cache(),
+            stream=stream,
+            publisher=LivePublisher(stream.client),
+        )
+        logger.info("Worker runtime started.")
+        return self._resources
+
+    def run(self, work: Callable[[WorkerResources], Coroutine[Any, Any, T]]) -> T:
+        """
+        Run a coroutine on the loop of this process.
+
+        Args:
+            work (Callable): Builds the coroutine from the shared resources.
+
+        Returns:
+            T: Result of the coroutine.
+        """
+        resources = self.start()
+        return resources.loop.run_until_complete(work(resources))
+
+    def close(self) -> None:
+        """Release the resources of this process, if any were created."""
+        if self._resources is None:
+            return
+        resources, self._resources = self._resources, None
+
+        async def release() -> None:
+            await resources.upstream.aclose()
+            await resources.cache.close()
+            await resources.stream.client.aclose()
+            await resources.engine.dispose()
+
+        try:
+            resources.loop.run_until_complete(release())
+            resources.loop.run_until_complete(resources.loop.shutdown_asyncgens())
+        finally:
+            resources.loop.close()
+            asyncio.set_event_loop(None)
+        logger.info("Worker runtime closed.")
+
+
+runtime = WorkerRuntime()
+
+
+@worker_init.connect  # type: ignore[misc]
+def prepare_worker_metrics(**kwargs: Any) -> None:
+    """Clear the metrics of a previous run before the pool is forked."""
+    reset_multiproc_dir()
+
+
+@worker_ready.connect  # type: ignore[misc]
+def serve_worker_metrics(**kwargs: Any) -> None:
+    """Expose the metrics of all pool processes on ``config.metrics.worker_port``."""
+    if config.metrics.worker_port:
+        start_http_server(config.metrics.worker_port, registry=registry())
+        logger.info("Serving metrics on port %d.", config.metrics.worker_port)
+
+
+@worker_process_init.connect  # type: ignore[misc]
+def start_worker_runtime(**kwargs: Any) -> None:
+    """Create the runtime of a freshly forked worker process."""
+    runtime.start()
+
+
+@worker_process_shutdown.connect  # type: ignore[misc]
+@worker_shutdown.connect  # type: ignore[misc]
+def close_worker_runtime(**kwargs: Any) -> None:
+    """Release the runtime when the worker process exits."""
+    runtime.close()
+    mark_process_dead(os.getpid())
+    # Pool processes leave through os._exit, which skips atexit hooks.
+    config.log_handler.stop()
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 
 from api.config import config
 
@@ -9,6 +10,10 @@ celery_app.conf.beat_schedule = {
         "task": "api.tasks.fetch_and_store_data",
         "schedule": 20.0,
     },
+    "apply-retention-daily": {
+        "task": "api.tasks.apply_retention",
+        "schedule": crontab(hour=3, minute=0),
+    },
 }
 
 celery_app.conf.timezone = "UTC"
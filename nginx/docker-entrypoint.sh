@@ -1,8 +1,13 @@
 #!/usr/bin/env sh
 set -eu
 
+: "${NGINX_CACHE_ZONE:=10m}"
+: "${NGINX_CACHE_MAX_SIZE:=256m}"
+: "${NGINX_UPSTREAM_KEEPALIVE:=64}"
+export NGINX_CACHE_ZONE NGINX_CACHE_MAX_SIZE NGINX_UPSTREAM_KEEPALIVE
+
 echo "Generating nginx config from template..."
-envsubst '${DOMAIN}' < /etc/nginx/conf.d/default.conf.template > /etc/nginx/conf.d/default.conf
+envsubst '${DOMAIN} ${NGINX_CACHE_ZONE} ${NGINX_CACHE_MAX_SIZE} ${NGINX_UPSTREAM_KEEPALIVE}' < /etc/nginx/conf.d/default.conf.template > /etc/nginx/conf.d/default.conf
 nginx -t || exit 1
 
 exec nginx -g "daemon off;"
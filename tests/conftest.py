@@ -4,9 +4,14 @@ from typing import AsyncGenerator
 
 import pytest
 from base import Base
+from cache import WeatherCache
 from db import DB
+from dependencies import get_cache
 from dependencies import get_db as gdb
+from dependencies import get_session_factory
+from fakeredis import FakeAsyncRedis
 from main import app
+from schema.wether_schema import WetherSchema
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
@@ -69,20 +74,48 @@ async def get_db() -> AsyncGenerator[DB, None]:
 
 
 @pytest.fixture
-def override_dependencies():
+def weather_cache() -> WeatherCache:
+    """
+    Provides a weather cache backed by an in-memory fake Redis server.
+    """
+    return WeatherCache(FakeAsyncRedis())
+
+
+@pytest.fixture
+def override_dependencies(weather_cache: WeatherCache):
 
     class FakeDB:
-        async def get_weather(self, city: str, day: date):
+        async def get_weather_rows(self, city: str, day: date):
             return [
-                {
-                    "id": 1,
-                    "city": city,
-                    "time_point": f"{day}T14:00:00",
-                    "temperature": 21.5,
-                }
+                WetherSchema(
+                    id=1,
+                    city=city,
+                    time_point=f"{day}T14:00:00",
+                    temperature=21.5,
+                )
             ]
 
     app.dependency_overrides.clear()
     app.dependency_overrides[gdb] = FakeDB
+    app.dependency_overrides[get_cache] = lambda: weather_cache
+    yield app
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def override_db_dependencies(weather_cache: WeatherCache):
+    """
+    Serves the application from the test database instead of a fake DB,
+    for endpoints that depend on real queries.
+    """
+
+    async def test_db() -> AsyncGenerator[DB, None]:
+        async with TestingSessionLocal() as session:
+            yield DB(session)
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides[gdb] = test_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_cache] = lambda: weather_cache
     yield app
     app.dependency_overrides.clear()
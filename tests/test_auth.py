@@ -0,0 +1,109 @@
+import pytest
+from auth import (
+    DBKeyBackend,
+    RateLimiter,
+    RedisKeyBackend,
+    TokenVerifier,
+    hash_token,
+)
+from cache import LocalCache
+from conftest import TestingSessionLocal
+from fakeredis import FakeAsyncRedis
+from models.api_key_model import ApiKey
+
+VALID_TOKEN = "a" * 32
+UNKNOWN_TOKEN = "b" * 32
+
+
+class CountingBackend(RedisKeyBackend):
+    """Redis backend counting its lookups."""
+
+    calls = 0
+
+    async def verify(self, token_hash: str) -> bool:
+        self.calls += 1
+        return await super().verify(token_hash)
+
+
+@pytest.mark.asyncio
+async def test_token_verifier_caches_verdicts():
+    """
+    Test that verifies valid and invalid verdicts are served from the cache.
+
+    Asserts:
+    - Malformed tokens are rejected without a backend lookup.
+    - Repeated lookups of a valid or an unknown key hit the backend once.
+    - An unknown key is cached only for the negative TTL, however often it
+      is retried, so a key created meanwhile is accepted.
+    """
+    now = [0.0]
+    client = FakeAsyncRedis()
+    await client.sadd("auth:keys", hash_token(VALID_TOKEN))
+    backend = CountingBackend(client, "auth:keys")
+    verifier = TokenVerifier(
+        backend,
+        LocalCache(100, 60.0, clock=lambda: now[0]),
+        ttl=60.0,
+        negative_ttl=5.0,
+    )
+
+    assert await verifier.verify("short") is None
+    assert backend.calls == 0
+
+    for _ in range(3):
+        assert await verifier.verify(VALID_TOKEN) == hash_token(VALID_TOKEN)
+        assert await verifier.verify(UNKNOWN_TOKEN) is None
+    assert backend.calls == 2
+
+    now[0] = 10.0
+    assert await verifier.verify(VALID_TOKEN) is not None
+    assert await verifier.verify(UNKNOWN_TOKEN) is None
+    assert backend.calls == 3
+
+    await client.sadd("auth:keys", hash_token(UNKNOWN_TOKEN))
+    for retry in range(1, 5):
+        now[0] = 10.0 + retry
+        assert await verifier.verify(UNKNOWN_TOKEN) is None
+    now[0] = 15.0
+    assert await verifier.verify(UNKNOWN_TOKEN) == hash_token(UNKNOWN_TOKEN)
+
+
+@pytest.mark.asyncio
+async def test_db_key_backend():
+    """Only active keys stored in the api_keys table are accepted."""
+    async with TestingSessionLocal() as session:
+        session.add(ApiKey(name="client", key_hash=hash_token(VALID_TOKEN)))
+        session.add(
+            ApiKey(name="revoked", key_hash=hash_token(UNKNOWN_TOKEN), active=False)
+        )
+        await session.commit()
+
+    backend = DBKeyBackend(TestingSessionLocal)
+    assert await backend.verify(hash_token(VALID_TOKEN))
+    assert not await backend.verify(hash_token(UNKNOWN_TOKEN))
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_token_bucket():
+    """
+    Test that verifies the Redis token bucket and the local lease.
+
+    Asserts:
+    - A key gets ``burst`` requests, then is limited.
+    - Keys have independent buckets.
+    - Leased tokens are spent without calling Redis.
+    """
+    client = FakeAsyncRedis()
+    limiter = RateLimiter(client, rate=0.001, burst=4, lease=2)
+    calls = []
+    script = limiter._script
+
+    async def counting_script(**kwargs):
+        calls.append(kwargs)
+        return await script(**kwargs)
+
+    limiter._script = counting_script
+
+    assert [await limiter.allow("key") for _ in range(5)] == [True] * 4 + [False]
+    assert len(calls) == 3
+    assert await limiter.allow("other")
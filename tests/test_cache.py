@@ -0,0 +1,175 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from cache import LocalCache, WeatherCache, cache_key, cache_ttl
+from config import config
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_reads_through(weather_cache: WeatherCache):
+    """
+    Test that verifies the cache calls the loader only on a miss.
+
+    Asserts:
+    - The first call runs the loader and stores its payload.
+    - The second call is served from Redis without running the loader.
+    - Invalidation forces the next call to load again.
+    """
+    calls = []
+    day = date.today()
+
+    async def loader() -> bytes:
+        calls.append(day)
+        return b'[{"city": "Kyiv"}]'
+
+    assert await weather_cache.get_or_load("Kyiv", day, loader) == b'[{"city": "Kyiv"}]'
+    assert await weather_cache.get_or_load("Kyiv", day, loader) == b'[{"city": "Kyiv"}]'
+    assert len(calls) == 1
+    assert await weather_cache.client.ttl(cache_key("Kyiv", day)) <= cache_ttl(day)
+
+    await weather_cache.invalidate([("Kyiv", day)])
+    await weather_cache.get_or_load("Kyiv", day, loader)
+    assert len(calls) == 2
+
+
+def test_cache_ttl_is_longer_for_past_days():
+    """Past days are immutable and are cached with the long TTL."""
+    assert cache_ttl(date.today()) == config.cache.today_ttl
+    assert cache_ttl(date.today() - timedelta(days=1)) == config.cache.past_ttl
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_falls_back_on_redis_errors():
+    """
+    Test that verifies a failing Redis server does not fail the request.
+    """
+
+    class BrokenRedis:
+        async def get(self, key):
+            raise RedisConnectionError("redis is down")
+
+    cache = WeatherCache(BrokenRedis())
+
+    async def loader() -> bytes:
+        return b"[]"
+
+    assert await cache.get_or_load("Kyiv", date.today(), loader) == b"[]"
+
+
+@pytest.mark.asyncio
+async def test_local_cache_ttl_and_eviction():
+    """
+    Test that verifies per-entry expiry and LRU eviction of the in-process tier.
+
+    Asserts:
+    - Entries expire once their TTL has passed.
+    - The least recently used entry is evicted when the cache is full.
+    - Counters reflect hits, misses and evictions.
+    """
+    now = [0.0]
+    cache = LocalCache(max_entries=2, ttl=10.0, clock=lambda: now[0])
+
+    async def loader() -> bytes:
+        return b"fresh"
+
+    cache.set("a", b"A")
+    cache.set("b", b"B")
+    assert cache.get("a") == b"A"
+    cache.set("c", b"C")
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+
+    now[0] = 11.0
+    assert await cache.get_or_load("a", loader) == b"fresh"
+    assert await cache.get_or_load("a", loader) == b"fresh"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_local_cache_coalesces_concurrent_misses():
+    """
+    Test that verifies 500 concurrent misses for one key run the loader once.
+    """
+    cache = LocalCache(max_entries=16, ttl=10.0)
+    calls = 0
+
+    async def loader() -> bytes:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"[]"
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("Kyiv", loader) for _ in range(500))
+    )
+
+    assert calls == 1
+    assert set(results) == {b"[]"}
+    assert cache.coalesced == 499
+
+
+@pytest.mark.asyncio
+async def test_local_cache_propagates_loader_errors():
+    """
+    Test that verifies a failed load reaches every waiter and is not cached.
+    """
+    cache = LocalCache(max_entries=16, ttl=10.0)
+
+    async def loader() -> bytes:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database is down")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("Kyiv", loader) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache.get("Kyiv") is None
+
+
+@pytest.mark.asyncio
+async def test_local_cache_survives_a_cancelled_load():
+    """
+    Test that verifies waiters do not fail when the loading caller is cancelled.
+
+    Steps:
+    - Starts a slow load, lets two callers wait for it, then cancels the
+      caller running it.
+
+    Asserts:
+    - The cancelled caller raises CancelledError.
+    - The waiters load the value again, once, and get it.
+    - Waiters that are cancelled themselves still raise CancelledError.
+    """
+    cache = LocalCache(max_entries=16, ttl=10.0)
+    calls = 0
+
+    async def loader() -> bytes:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return b"[]"
+
+    first = asyncio.create_task(cache.get_or_load("Kyiv", loader))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_or_load("Kyiv", loader)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await asyncio.gather(*waiters) == [b"[]", b"[]"]
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert calls == 2
+    assert cache.get("Kyiv") == b"[]"
+
+    loading = asyncio.create_task(cache.get_or_load("Lviv", loader))
+    waiter = asyncio.create_task(cache.get_or_load("Lviv", loader))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    loading.cancel()
+    results = await asyncio.gather(loading, waiter, return_exceptions=True)
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
@@ -0,0 +1,32 @@
+from config import Settings
+
+
+def test_settings_read_the_environment(monkeypatch):
+    """
+    Test that verifies every settings group reads its prefixed variables.
+
+    Steps:
+    - Sets variables of several groups and builds the settings.
+
+    Asserts:
+    - The values are read and converted to the field types.
+    - Groups without variables keep their defaults.
+    """
+    monkeypatch.setenv("SERVER_WORKERS", "3")
+    monkeypatch.setenv("CACHE_ENABLED", "false")
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+    monkeypatch.setenv("AUTH_BACKEND", "db")
+    monkeypatch.setenv("INGEST_WRITE_BEHIND", "true")
+    monkeypatch.setenv("EXTAPI_CITIES", '["Kyiv", "Lviv"]')
+
+    settings = Settings()
+
+    assert settings.server.workers == 3
+    assert settings.cache.enabled is False
+    assert settings.db.pool_size == 20
+    assert settings.db.pgbouncer is True
+    assert settings.auth.backend == "db"
+    assert settings.ingest.write_behind is True
+    assert settings.extapi.cities == ("Kyiv", "Lviv")
+    assert settings.live.max_cities == 50
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from cache import WeatherCache
+from conftest import TestingSessionLocal
+from db import DB, WeatherReading
+from fakeredis import FakeAsyncRedis
+from ingest import Flusher, ReadingStream, decode_reading, encode_reading
+
+
+def test_reading_round_trip():
+    """A reading survives encoding to stream fields and back."""
+    reading = WeatherReading("Kyiv", 21.25, datetime(2025, 5, 1, 12, 30, 15, 5))
+    fields = {k.encode(): v.encode() for k, v in encode_reading(reading).items()}
+
+    assert decode_reading(fields) == reading
+
+
+@pytest.mark.asyncio
+async def test_flusher_stores_and_acknowledges_batches(weather_cache: WeatherCache):
+    """
+    Test that verifies write-behind ingestion through the reading stream.
+
+    Steps:
+    - Appends readings, a repeated one and a malformed entry to the stream.
+    - Flushes them into the test database.
+
+    Asserts:
+    - Every reading is stored once and the batch is acknowledged and deleted.
+    - Entries taken by a flusher that died before acknowledging them are
+      claimed by another one.
+    """
+    client = FakeAsyncRedis()
+    stream = ReadingStream(client, "readings", "flusher")
+    await stream.ensure_group()
+    await stream.ensure_group()
+    start = datetime(2025, 5, 1)
+    readings = [
+        WeatherReading("Kyiv", float(i), start + timedelta(hours=i)) for i in range(3)
+    ]
+
+    assert await stream.append(readings + readings[:1]) == 4
+    await client.xadd("readings", {"city": "Kyiv"})
+    flusher = Flusher(stream, TestingSessionLocal, weather_cache, "first")
+    assert await flusher.flush_once() == 5
+    assert await flusher.report() == {"length": 0, "pending": 0}
+    async with TestingSessionLocal() as session:
+        stored = await DB(session).get_weather("Kyiv", start.date())
+    assert sorted(row.temperature for row in stored) == [0.0, 1.0, 2.0]
+
+    await stream.append([WeatherReading("Lviv", 5.0, start)])
+    assert len(await stream.read("dead", 10, 0, claim_idle_ms=60_000)) == 1
+    assert await stream.backlog() == {"length": 1, "pending": 1}
+    assert await flusher.flush_once() == 0
+    claimed = await stream.read("second", 10, 0, claim_idle_ms=0)
+    assert [reading for _, reading in claimed] == [WeatherReading("Lviv", 5.0, start)]
+
+
+@pytest.mark.asyncio
+async def test_flusher_announces_only_new_readings(weather_cache: WeatherCache):
+    """
+    Test that verifies a redelivered batch is not announced again.
+
+    Steps:
+    - Flushes a batch of readings with a live publisher.
+    - Appends the same readings again, as a redelivery would, and flushes them.
+
+    Asserts:
+    - The first flush announces every reading.
+    - The redelivered batch is stored as duplicates and announces nothing.
+    """
+
+    class Publisher:
+        def __init__(self):
+            self.published: list[WeatherReading] = []
+
+        async def publish(self, readings):
+            self.published.extend(readings)
+
+    stream = ReadingStream(FakeAsyncRedis(), "readings", "flusher")
+    await stream.ensure_group()
+    start = datetime(2025, 5, 1)
+    readings = [
+        WeatherReading("Kyiv", float(i), start + timedelta(hours=i)) for i in range(3)
+    ]
+    publisher = Publisher()
+    flusher = Flusher(
+        stream, TestingSessionLocal, weather_cache, "flusher", publisher=publisher
+    )
+
+    await stream.append(readings)
+    assert await flusher.flush_once() == 3
+    assert publisher.published == readings
+
+    await stream.append(readings)
+    assert await flusher.flush_once() == 3
+    assert publisher.published == readings
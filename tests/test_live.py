@@ -0,0 +1,111 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from config import config
+from db import WeatherReading
+from dependencies import get_live_hub
+from fakeredis import FakeAsyncRedis, FakeServer
+from fastapi.testclient import TestClient
+from live import LiveHub, LiveHubFull, LivePublisher, Subscription, sse_events
+from main import app
+
+
+@pytest.mark.asyncio
+async def test_live_hub_fans_out_and_coalesces(monkeypatch):
+    """
+    Test that verifies live readings reach the subscribers of their city.
+
+    Asserts:
+    - Every subscriber of a city receives its newest reading.
+    - A burst of readings of one city is delivered as the latest one.
+    - The hub rejects subscribers beyond its limit and forgets closed ones.
+    """
+    monkeypatch.setattr(config.live, "coalesce", 0.05)
+    server = FakeServer()
+    hub = LiveHub(FakeAsyncRedis(server=server), max_subscribers=2)
+    publisher = LivePublisher(FakeAsyncRedis(server=server))
+    kyiv = await hub.subscribe(["Kyiv"])
+    both = await hub.subscribe(["Kyiv", "Lviv"])
+    with pytest.raises(LiveHubFull):
+        await hub.subscribe(["Odesa"])
+
+    start = datetime(2025, 5, 1, 12)
+    await publisher.publish(
+        [WeatherReading("Kyiv", 1.0, start), WeatherReading("Lviv", 2.0, start)]
+    )
+    await publisher.publish([WeatherReading("Kyiv", 3.0, start.replace(hour=13))])
+
+    messages = [json.loads(m) for m in await kyiv.get(timeout=1)]
+    assert messages == [
+        {"city": "Kyiv", "temperature": 3.0, "time_point": "2025-05-01T13:00:00"}
+    ]
+    messages = [json.loads(m) for m in await both.get(timeout=1)]
+    assert sorted(m["temperature"] for m in messages) == [2.0, 3.0]
+
+    hub.unsubscribe(kyiv)
+    hub.unsubscribe(kyiv)
+    assert await kyiv.get(timeout=1) == []
+    assert hub.subscribers == {"Kyiv": {both}, "Lviv": {both}}
+    await hub.subscribe(["Odesa"])
+    await hub.close()
+    assert both.closed
+
+
+@pytest.mark.asyncio
+async def test_sse_events(monkeypatch):
+    """SSE streams send readings as events and a comment while idle."""
+    monkeypatch.setattr(config.live, "coalesce", 0)
+    subscription = Subscription(["Kyiv"])
+    subscription.push("Kyiv", b'{"city": "Kyiv"}')
+    events = sse_events(subscription, heartbeat=0.01)
+
+    assert await anext(events) == b": connected\n\n"
+    assert await anext(events) == b'event: reading\ndata: {"city": "Kyiv"}\n\n'
+    assert await anext(events) == b": keep-alive\n\n"
+    subscription.close()
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(anext(events), 1)
+
+
+def test_live_websocket_endpoint(monkeypatch):
+    """
+    Integration test for the /weather/live/ws endpoint.
+
+    Verifies:
+    1. The token is accepted as a query parameter.
+    2. Readings of the subscribed cities are sent as JSON text messages.
+    3. The subscription is released when the client disconnects.
+    """
+    monkeypatch.setattr(config.live, "coalesce", 0)
+
+    class FakeHub:
+        def __init__(self):
+            self.subscriptions = []
+            self.released = []
+
+        async def subscribe(self, cities):
+            subscription = Subscription(cities)
+            subscription.push("Kyiv", b'{"city": "Kyiv", "temperature": 1.5}')
+            self.subscriptions.append(subscription)
+            return subscription
+
+        def unsubscribe(self, subscription):
+            subscription.close()
+            self.released.append(subscription)
+
+    hub = FakeHub()
+    app.dependency_overrides[get_live_hub] = lambda: hub
+    try:
+        client = TestClient(app)
+        url = f"/weather/live/ws?city=Kyiv&token={'x' * 32}"
+        with client.websocket_connect(url) as websocket:
+            assert websocket.receive_json() == {"city": "Kyiv", "temperature": 1.5}
+        assert hub.subscriptions[0].cities == {"Kyiv"}
+        assert hub.released == hub.subscriptions
+
+        response = client.get("/weather/live?city=Kyiv&token=short")
+        assert response.status_code == 401
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,101 @@
+import io
+import json
+import logging
+import threading
+
+import logs
+import pytest
+from config import LogConfig
+from logs import JSONFormatter, ProcessQueueHandler, SampleFilter
+from pydantic import ValidationError
+
+
+def test_process_queue_handler_writes_json_off_thread(monkeypatch):
+    """
+    Test that verifies records are written by a per-process listener.
+
+    Steps:
+    - Logs through a queue handler writing JSON to an in-memory stream.
+    - Simulates a fork by changing the process id.
+
+    Asserts:
+    - Stopping the listener flushes the queued records as JSON lines.
+    - A new process gets its own listener and target.
+    """
+    streams = []
+
+    def create_target() -> logging.Handler:
+        stream = io.StringIO()
+        streams.append(stream)
+        target = logging.StreamHandler(stream)
+        target.setFormatter(JSONFormatter())
+        return target
+
+    handler = ProcessQueueHandler(create_target)
+    logger = logging.getLogger("tests.logs")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("stored %d readings", 3)
+        parent = handler.listener
+        monkeypatch.setattr(logs.os, "getpid", lambda: -1)
+        logger.warning("from the child")
+        handler.stop()
+        parent.stop()
+    finally:
+        logger.removeHandler(handler)
+
+    assert len(streams) == 2
+    entry = json.loads(streams[0].getvalue())
+    assert entry["message"] == "stored 3 readings"
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "tests.logs"
+    assert json.loads(streams[1].getvalue())["message"] == "from the child"
+
+
+def test_process_queue_handler_formats_on_the_listener():
+    """The message of a record is rendered by the listener thread."""
+    threads = []
+
+    class Argument:
+        def __str__(self):
+            threads.append(threading.current_thread())
+            return "argument"
+
+    stream = io.StringIO()
+    handler = ProcessQueueHandler(lambda: logging.StreamHandler(stream))
+    logger = logging.getLogger("tests.logs.format")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("formatted %s", Argument())
+        handler.stop()
+    finally:
+        logger.removeHandler(handler)
+
+    assert stream.getvalue() == "formatted argument\n"
+    assert len(threads) == 1
+    assert threads[0] is not threading.current_thread()
+
+
+def test_sample_filter():
+    """Debug records are sampled, INFO and above always pass."""
+    drop_debug = SampleFilter(0.0)
+    debug = logging.LogRecord("x", logging.DEBUG, __file__, 1, "m", None, None)
+    info = logging.LogRecord("x", logging.INFO, __file__, 1, "m", None, None)
+    assert not drop_debug.filter(debug)
+    assert drop_debug.filter(info)
+    assert SampleFilter(1.0).filter(debug)
+
+
+def test_debug_logging_is_configured_from_the_environment(monkeypatch):
+    """LOG_LEVEL sets the logger level and LOG_DEBUG_SAMPLE_RATE the sampling."""
+    monkeypatch.setenv("LOG_LEVEL", "debug")
+    monkeypatch.setenv("LOG_DEBUG_SAMPLE_RATE", "0.25")
+    log_config = LogConfig()
+    assert log_config.levelno == logging.DEBUG
+    assert log_config.debug_sample_rate == 0.25
+
+    monkeypatch.setenv("LOG_LEVEL", "verbose")
+    with pytest.raises(ValidationError):
+        LogConfig()
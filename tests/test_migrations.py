@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from alembic import command
+from base import Base
+from migrate import (
+    BASELINE,
+    ROLLUPS,
+    alembic_config,
+    current_revision,
+    rollups_created,
+    upgrade,
+)
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    inspect,
+    select,
+)
+
+# The weather table as the models defined it before migrations existed.
+baseline = MetaData()
+baseline_weather = Table(
+    "weather",
+    baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("city", String, nullable=False),
+    Column("time_point", DateTime, nullable=False, index=True),
+    Column("temperature", Float, nullable=False),
+)
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    """
+    Test that verifies the migrations and the models agree.
+
+    Steps:
+    - Migrates an empty database, then migrates it again.
+    - Migrates a database created by ``create_all`` without a version.
+
+    Asserts:
+    - The migrated schema has no differences from the models.
+    - Migrating an up-to-date database does nothing.
+    - An unversioned database is stamped with the baseline revision.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    with engine.begin() as connection:
+        assert upgrade(connection) is None
+    with engine.begin() as connection:
+        head = current_revision(connection)
+        command.check(alembic_config(connection))
+        assert upgrade(connection) == head
+    engine.dispose()
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    with engine.begin() as connection:
+        Base.metadata.create_all(connection)
+    with engine.begin() as connection:
+        assert upgrade(connection) == BASELINE
+        assert current_revision(connection) == head
+        command.check(alembic_config(connection))
+    engine.dispose()
+
+
+def test_migrations_upgrade_the_baseline_schema(tmp_path):
+    """
+    Test that verifies an unversioned baseline database is brought up to date.
+
+    Steps:
+    - Creates the original weather table holding a repeated reading.
+    - Migrates it.
+
+    Asserts:
+    - The index, rollup and API key tables are added and match the models.
+    - The repeated reading is deleted so (city, time_point) is unique.
+    - The migration reports that the rollups must be rebuilt.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    time_point = datetime(2025, 6, 1, 12)
+    with engine.begin() as connection:
+        baseline.create_all(connection)
+        connection.execute(
+            baseline_weather.insert(),
+            [
+                {"city": "Kyiv", "time_point": time_point, "temperature": 20.0},
+                {"city": "Kyiv", "time_point": time_point, "temperature": 20.0},
+                {"city": "Lviv", "time_point": time_point, "temperature": 18.0},
+            ],
+        )
+    with engine.begin() as connection:
+        before = upgrade(connection)
+        after = current_revision(connection)
+        command.check(alembic_config(connection))
+
+        inspector = inspect(connection)
+        assert set(inspector.get_table_names()) == {
+            "alembic_version",
+            "api_keys",
+            "weather",
+            "weather_daily",
+            "weather_hourly",
+        }
+        indexes = {i["name"]: i for i in inspector.get_indexes("weather")}
+        assert indexes["ix_weather_city_time_point"]["unique"]
+        count = connection.execute(select(func.count()).select_from(baseline_weather))
+        assert count.scalar() == 2
+    engine.dispose()
+
+    assert before == BASELINE
+    assert rollups_created(before, after)
+    assert not rollups_created(after, after)
+    assert not rollups_created(BASELINE, "0002")
+    assert rollups_created(None, ROLLUPS)
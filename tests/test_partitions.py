@@ -0,0 +1,15 @@
+from datetime import date
+
+from partitions import create_partition_ddl, month_start, next_month, partition_name
+
+
+def test_partition_helpers():
+    """
+    Test that verifies monthly partition naming and bounds, including year wrap.
+    """
+    assert month_start(date(2025, 5, 17)) == date(2025, 5, 1)
+    assert next_month(date(2025, 12, 1)) == date(2026, 1, 1)
+    assert partition_name(date(2025, 5, 1)) == "weather_p202505"
+    assert "FROM ('2025-12-01') TO ('2026-01-01')" in str(
+        create_partition_ddl(date(2025, 12, 1))
+    )
@@ -0,0 +1,45 @@
+from config import config
+from server import available_cpus, cpu_quota, worker_count
+
+
+def test_cpu_quota_reads_cgroup_v2_and_v1(tmp_path):
+    """
+    Test that verifies the CPU limit is read from the container cgroup.
+
+    Asserts:
+    - cgroup v2 quotas are divided by their period; "max" means no limit.
+    - cgroup v1 quotas are read when there is no v2 file; -1 means no limit.
+    - Without cgroup files the CPUs are not limited.
+    """
+    assert cpu_quota(tmp_path) is None
+
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cpu_quota(tmp_path) == 1.5
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cpu_quota(tmp_path) is None
+
+    (tmp_path / "cpu.max").unlink()
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    assert cpu_quota(tmp_path) == 2.0
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    assert cpu_quota(tmp_path) is None
+
+
+def test_worker_count_follows_the_quota(tmp_path, monkeypatch):
+    """Workers follow the CPU quota within bounds unless set explicitly."""
+    monkeypatch.setattr("server.os.sched_getaffinity", lambda pid: set(range(8)))
+    monkeypatch.setattr(config.server, "workers_per_cpu", 1.0)
+    monkeypatch.setattr(config.server, "max_workers", 6)
+
+    assert available_cpus(tmp_path) == 8
+    assert worker_count(tmp_path) == 6
+
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert worker_count(tmp_path) == 1
+    (tmp_path / "cpu.max").write_text("250000 100000\n")
+    assert worker_count(tmp_path) == 3
+
+    monkeypatch.setattr(config.server, "workers", 4)
+    assert worker_count(tmp_path) == 4
@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import main
+import pytest
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.exc import OperationalError
+
+API = Path(__file__).resolve().parent.parent / "api"
+
+IMPORT_PROBE = """
+import json, sys, threading
+import main
+print(json.dumps({
+    "threads": threading.active_count(),
+    "modules": [name for name in ("pyarrow", "alembic") if name in sys.modules],
+}))
+"""
+
+
+def test_app_import_does_no_io(tmp_path):
+    """
+    Test that verifies importing the application does no I/O.
+
+    Steps:
+    - Imports ``main`` in a fresh interpreter from an empty directory.
+
+    Asserts:
+    - No thread is started and no file (e.g. a log) is written.
+    - Modules only needed later, like pyarrow and alembic, are not loaded.
+    """
+    env = {**os.environ, "PYTHONPATH": str(API)}
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    probe = json.loads(result.stdout)
+
+    assert probe["threads"] == 1
+    assert probe["modules"] == []
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_health_and_readiness_probes(monkeypatch):
+    """
+    Integration test for /healthz and /readyz.
+
+    Verifies:
+    1. Liveness does not depend on the database.
+    2. Readiness fails until the worker has started, and while the
+       database is unreachable.
+    """
+    checks = []
+
+    async def check_database():
+        checks.append(True)
+        if len(checks) > 1:
+            raise OperationalError("SELECT 1", None, OSError("unreachable"))
+
+    monkeypatch.setattr(main, "check_database", check_database)
+    app = main.app
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/healthz")
+        assert response.status_code == 200
+
+        monkeypatch.setattr(app.state, "ready", False, raising=False)
+        response = await ac.get("/readyz")
+        assert response.status_code == 503
+        assert response.json() == {"status": "starting"}
+
+        app.state.ready = True
+        response = await ac.get("/readyz")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+        response = await ac.get("/readyz")
+        assert response.status_code == 503
+        assert response.json() == {"status": "unavailable"}
+
+
+def test_lifespan_warms_up_the_pool(monkeypatch):
+    """The worker opens its connections on startup and becomes ready."""
+    warmed = []
+
+    async def warm_up_pool(count):
+        warmed.append(count)
+        return count
+
+    async def check_database():
+        pass
+
+    class LiveHub:
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(main, "live_hub", LiveHub())
+    monkeypatch.setattr(main, "warm_up_pool", warm_up_pool)
+    monkeypatch.setattr(main, "check_database", check_database)
+    with TestClient(main.app) as client:
+        assert warmed == [main.config.db.warmup_connections]
+        assert client.get("/readyz").status_code == 200
+    assert main.app.state.ready is False
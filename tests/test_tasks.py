@@ -0,0 +1,174 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+
+import pytest
+import tasks
+from cache import WeatherCache, cache_key
+from config import config
+from conftest import TestingSessionLocal
+from db import DB, WeatherReading
+from fakeredis import FakeAsyncRedis
+from ingest import ReadingStream
+from models.rollup_model import WeatherDaily
+from models.weather_model import Weather
+from sqlalchemy import func, insert, select
+from upstream import Observation
+from worker_runtime import WorkerRuntime
+
+
+class FakeUpstream:
+    """Weather provider client returning fixed observations."""
+
+    def __init__(self, observations: list[Observation]):
+        self.observations = observations
+        self.stored: list[Observation] = []
+
+    async def fetch_many(self, cities):
+        return list(self.observations)
+
+    def mark_stored(self, observations):
+        self.stored.extend(observations)
+
+
+class FakePublisher:
+    """Live publisher recording the announced readings."""
+
+    def __init__(self):
+        self.published: list[WeatherReading] = []
+
+    async def publish(self, readings):
+        self.published.extend(readings)
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_store_data():
+    """
+    Test that verifies the fetch task stores, invalidates and announces readings.
+
+    Steps:
+    - Runs the task twice with the same observations.
+    - Runs it once more with write-behind ingestion.
+
+    Asserts:
+    - Readings are stored at their observation time, once despite the rerun.
+    - Stored observations are marked on the client.
+    - The cached responses of the stored days are invalidated.
+    - The readings are published to live subscribers once, not on the rerun.
+    - With write-behind ingestion the readings are queued, not stored.
+    """
+    observed_at = datetime(2025, 5, 1, 14)
+    upstream = FakeUpstream(
+        [
+            Observation("Kyiv", 21.5, "1", None, observed_at),
+            Observation("Lviv", 18.0, "1", None, observed_at),
+        ]
+    )
+    cache = WeatherCache(FakeAsyncRedis())
+    key = cache_key("Kyiv", observed_at.date())
+    await cache.client.set(key, b"[]")
+    publisher = FakePublisher()
+
+    for _ in range(2):
+        await tasks._fetch_and_store_data_async(
+            upstream, TestingSessionLocal, cache, publisher=publisher
+        )
+
+    async with TestingSessionLocal() as session:
+        rows = (await session.execute(select(Weather))).scalars().all()
+    assert sorted((r.city, r.time_point) for r in rows) == [
+        ("Kyiv", observed_at),
+        ("Lviv", observed_at),
+    ]
+    assert upstream.stored == upstream.observations * 2
+    assert await cache.client.get(key) is None
+    assert [r.city for r in publisher.published] == ["Kyiv", "Lviv"]
+
+    stream = ReadingStream(FakeAsyncRedis(), "weather:readings", "flusher")
+    await tasks._fetch_and_store_data_async(
+        upstream, TestingSessionLocal, cache, stream=stream
+    )
+    assert await stream.client.xlen("weather:readings") == 2
+    assert len(upstream.stored) == 6
+    async with TestingSessionLocal() as session:
+        count = await session.execute(select(func.count()).select_from(Weather))
+        assert count.scalar() == 2
+
+
+@pytest.mark.asyncio
+async def test_apply_retention(monkeypatch):
+    """
+    Test that verifies retention keeps rollups and deletes old raw readings.
+
+    Steps:
+    - Inserts old readings behind the rollups' back, as if ingested before
+      rollups existed, plus one recent reading.
+    - Runs the retention job with a small batch size.
+    - Rebuilds the rollups of every day since the old readings.
+
+    Asserts:
+    - Old raw readings are deleted, recent ones are kept.
+    - The old readings survive in the daily rollup, also after the rebuild.
+    - The report counts the deleted rows and the rebuilt days.
+    """
+    monkeypatch.setattr(config.retention, "raw_days", 30)
+    monkeypatch.setattr(config.retention, "batch_size", 2)
+    old_day = datetime.combine(date.today() - timedelta(days=40), time.min)
+    recent = datetime.now()
+
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            insert(Weather),
+            [
+                {
+                    "city": "Kyiv",
+                    "temperature": float(i),
+                    "time_point": old_day + timedelta(hours=i),
+                }
+                for i in range(5)
+            ],
+        )
+        await session.commit()
+        await DB(session).set_weather_many([WeatherReading("Kyiv", 1.0, recent)])
+
+    report = await tasks._apply_retention_async(TestingSessionLocal)
+
+    assert report["deleted"] == 5
+    assert report["rebuilt_days"] == 1
+    async with TestingSessionLocal() as session:
+        remaining = (await session.execute(select(Weather))).scalars().all()
+        assert [r.time_point for r in remaining] == [recent]
+        daily = await session.get(WeatherDaily, ("Kyiv", old_day))
+        assert daily.count == 5
+        assert daily.max_temperature == 4.0
+
+    async with TestingSessionLocal() as session:
+        end = recent + timedelta(days=1)
+        assert await DB(session).rebuild_rollups(old_day, end) == 1
+    async with TestingSessionLocal() as session:
+        daily = await session.get(WeatherDaily, ("Kyiv", old_day))
+        assert daily.count == 5
+
+
+def test_worker_runtime_reuses_resources():
+    """
+    Test that verifies tasks of a worker process share one loop and client.
+
+    Asserts:
+    - Consecutive runs execute on the same event loop with the same client.
+    - Closing releases the client and the loop, and is idempotent.
+    """
+    runtime = WorkerRuntime()
+
+    async def current(resources):
+        return asyncio.get_running_loop(), resources.upstream.client
+
+    first = runtime.run(current)
+    second = runtime.run(current)
+    assert first == second
+    loop, client = first
+
+    runtime.close()
+    runtime.close()
+    assert not runtime.started
+    assert loop.is_closed()
+    assert client.is_closed
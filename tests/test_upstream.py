@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+from upstream import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Observation,
+    RateBudget,
+    UpstreamClient,
+    UpstreamError,
+    create_http_client,
+)
+
+
+class FakeProvider:
+    """Weather provider answering from a script of statuses per city."""
+
+    def __init__(self, statuses: dict[str, list[int]] | None = None):
+        self.statuses = statuses or {}
+        self.calls: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        city = request.url.params["q"]
+        self.calls.append(city)
+        script = self.statuses.get(city)
+        status = script.pop(0) if script else 200
+        if status == 0:
+            raise httpx.ConnectTimeout("timed out", request=request)
+        if status != 200:
+            return httpx.Response(status, json={"error": {"message": "failed"}})
+        current = {"temp_c": len(city), "last_updated_epoch": 1746700000}
+        return httpx.Response(200, json={"current": current})
+
+
+def make_client(provider: FakeProvider, **kwargs) -> UpstreamClient:
+    async def no_sleep(seconds: float) -> None:
+        return None
+
+    return UpstreamClient(
+        create_http_client(httpx.MockTransport(provider)),
+        budget=RateBudget(0, 1),
+        sleep=no_sleep,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_retries_and_skips_failures():
+    """
+    Test that verifies concurrent fetching with retries of transient errors.
+
+    Asserts:
+    - Timeouts and 503 responses are retried until they succeed.
+    - Cities the provider rejects (400) are skipped without retries.
+    """
+    provider = FakeProvider({"Kyiv": [0, 503], "Nowhere": [400]})
+    upstream = make_client(provider)
+
+    observations = await upstream.fetch_many(["Kyiv", "Nowhere", "Lviv"])
+
+    observed_at = datetime.fromtimestamp(1746700000)
+    assert observations == [
+        Observation("Kyiv", 4.0, "1746700000", None, observed_at),
+        Observation("Lviv", 4.0, "1746700000", None, observed_at),
+    ]
+    assert provider.calls.count("Kyiv") == 3
+    assert provider.calls.count("Nowhere") == 1
+    await upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_skips_stored_observations():
+    """An observation already stored is not returned again."""
+    upstream = make_client(FakeProvider())
+    observation = await upstream.fetch("Kyiv")
+    upstream.mark_stored([observation])
+
+    assert await upstream.fetch("Kyiv") is None
+    assert await upstream.fetch_many(["Kyiv"]) == []
+    await upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_stops_calls():
+    """
+    Test that verifies the breaker opens on failures and recovers.
+
+    Asserts:
+    - After the threshold, calls fail without reaching the provider.
+    - After the reset timeout a trial call closes the circuit again.
+    """
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=3, reset_timeout=30.0, clock=lambda: now[0])
+    provider = FakeProvider({"Kyiv": [503] * 3})
+    upstream = make_client(provider, breaker=breaker)
+
+    with pytest.raises(UpstreamError):
+        await upstream.fetch_many(["Kyiv"])
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await upstream.fetch("Lviv")
+    assert provider.calls == ["Kyiv"] * 3
+
+    now[0] = 31.0
+    assert breaker.state == "half-open"
+    assert await upstream.fetch("Lviv") is not None
+    assert breaker.state == "closed"
+    await upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_trial_ends_on_any_exception(monkeypatch):
+    """
+    Test that verifies an aborted trial call does not keep the circuit stuck.
+
+    Asserts:
+    - A trial call raising an unexpected error lets the next call through.
+    - So does a cancelled trial call.
+    """
+    now = [31.0]
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30.0, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.opened_at = 0.0
+    outcomes: list[BaseException | None] = [RuntimeError("bug"), None]
+
+    def provider(request: httpx.Request) -> httpx.Response:
+        outcome = outcomes.pop(0)
+        if outcome is not None:
+            raise outcome
+        current = {"temp_c": 1.0, "last_updated_epoch": 1746700000}
+        return httpx.Response(200, json={"current": current})
+
+    upstream = make_client(provider, breaker=breaker)
+    with pytest.raises(RuntimeError):
+        await upstream.fetch("Kyiv")
+    assert breaker.allow()
+    breaker.release()
+
+    started = asyncio.Event()
+
+    async def slow_acquire() -> None:
+        started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(upstream.budget, "acquire", slow_acquire)
+    trial = asyncio.create_task(upstream.fetch("Kyiv"))
+    await started.wait()
+    assert not breaker.allow()
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+    assert breaker.allow()
+    await upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_rate_budget_waits_for_tokens():
+    """Requests beyond the burst wait for the bucket to refill."""
+    now = [0.0]
+    waits = []
+
+    async def sleep(seconds: float) -> None:
+        waits.append(seconds)
+        now[0] += seconds
+
+    budget = RateBudget(rate=2.0, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        await budget.acquire()
+
+    assert waits == [0.5, 0.5]
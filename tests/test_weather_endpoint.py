@@ -1,5 +1,15 @@
+import json
+from datetime import date, datetime
+
+import msgpack
+import pyarrow.ipc
 import pytest
+from config import config
+from conftest import TestingSessionLocal
+from db import DB, WeatherReading
 from httpx import ASGITransport, AsyncClient
+from schema.wether_schema import WetherSchema
+from serializers import negotiate
 
 
 @pytest.mark.asyncio
@@ -38,3 +48,386 @@ async def test_weather_endpoint(override_dependencies):
         assert isinstance(data, list)
         assert data[0]["city"] == "Kyiv"
         assert all(isinstance(i["temperature"], float) for i in data)
+
+
+@pytest.mark.asyncio
+async def test_weather_range_and_stream_endpoints(override_db_dependencies):
+    """
+    Integration test for the /weather/range and /weather/stream endpoints.
+
+    Verifies:
+    1. /weather/range returns pages linked by 'next_cursor'.
+    2. An inverted range or a malformed cursor returns 400 Bad Request.
+    3. /weather/stream returns every record of the range as NDJSON.
+    """
+    async with TestingSessionLocal() as session:
+        await DB(session).set_weather_many(
+            WeatherReading("Kyiv", float(i), datetime(2025, 5, 1, i)) for i in range(5)
+        )
+
+    app = override_db_dependencies
+    headers = {"x-token": "x" * 32}
+    params = {"city": "Kyiv", "start": "2025-05-01T00:00:00", "end": "2025-05-02"}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get(
+            "/weather/range", params={**params, "limit": 3}, headers=headers
+        )
+        assert response.status_code == 200
+        first = response.json()
+        assert [i["temperature"] for i in first["items"]] == [4.0, 3.0, 2.0]
+
+        response = await ac.get(
+            "/weather/range",
+            params={**params, "limit": 3, "cursor": first["next_cursor"]},
+            headers=headers,
+        )
+        second = response.json()
+        assert [i["temperature"] for i in second["items"]] == [1.0, 0.0]
+        assert second["next_cursor"] is None
+
+        response = await ac.get(
+            "/weather/range", params={**params, "cursor": "broken"}, headers=headers
+        )
+        assert response.status_code == 400
+
+        response = await ac.get(
+            "/weather/range",
+            params={**params, "start": "2025-05-03", "end": "2025-05-01"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+        response = await ac.get("/weather/stream", params=params, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [i["temperature"] for i in lines] == [4.0, 3.0, 2.0, 1.0, 0.0]
+
+
+@pytest.mark.asyncio
+async def test_weather_batch_endpoint(override_db_dependencies):
+    """
+    Integration test for the /weather/batch endpoint.
+
+    Verifies:
+    1. Records of every requested city within [start, end) are grouped by
+       city, newest first; cities without data get an empty list.
+    2. Too many cities or days return 400 Bad Request.
+    3. Ranges that ended before today get the long nginx cache TTL.
+    """
+    async with TestingSessionLocal() as session:
+        await DB(session).set_weather_many(
+            [
+                WeatherReading("Kyiv", 1.0, datetime(2025, 5, 1, 12)),
+                WeatherReading("Kyiv", 2.0, datetime(2025, 5, 3, 12)),
+                WeatherReading("Kyiv", 9.0, datetime(2025, 5, 8)),
+                WeatherReading("Lviv", 3.0, datetime(2025, 5, 2, 6)),
+                WeatherReading("Odesa", 4.0, datetime(2025, 5, 2, 6)),
+            ]
+        )
+
+    app = override_db_dependencies
+    headers = {"x-token": "x" * 32}
+    params = {
+        "city": ["Kyiv", "Lviv", "Dnipro", "Kyiv"],
+        "start": "2025-05-01",
+        "end": "2025-05-08",
+    }
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/weather/batch", params=params, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data) == ["Kyiv", "Lviv", "Dnipro"]
+        assert [i["temperature"] for i in data["Kyiv"]] == [2.0, 1.0]
+        assert data["Lviv"][0]["time_point"] == "2025-05-02T06:00:00"
+        assert data["Dnipro"] == []
+        assert response.headers["x-accel-expires"] == str(config.cache.edge_past_ttl)
+
+        response = await ac.get(
+            "/weather/batch",
+            params={**params, "city": [f"City{i}" for i in range(51)]},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+        response = await ac.get(
+            "/weather/batch", params={**params, "end": "2025-07-01"}, headers=headers
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_weather_aggregate_endpoint(override_db_dependencies):
+    """
+    Integration test for the /weather/aggregate endpoint.
+
+    Verifies:
+    1. Statistics are returned as aligned columns per city.
+    2. Too many buckets or an invalid percentile return 400 Bad Request.
+    """
+    async with TestingSessionLocal() as session:
+        await DB(session).set_weather_many(
+            WeatherReading("Kyiv", float(i), datetime(2025, 5, 1, 0, i * 10))
+            for i in range(6)
+        )
+
+    app = override_db_dependencies
+    headers = {"x-token": "x" * 32}
+    params = {"city": "Kyiv", "start": "2025-05-01", "end": "2025-05-02"}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get(
+            "/weather/aggregate",
+            params={**params, "bucket": "1h", "percentile": "0.5"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        kyiv = response.json()["cities"]["Kyiv"]
+        assert kyiv["time"] == ["2025-05-01T00:00:00"]
+        assert kyiv["count"] == [6]
+        assert kyiv["avg"] == [2.5]
+        assert kyiv["percentiles"] == {"p50": [2.5]}
+
+        response = await ac.get(
+            "/weather/aggregate",
+            params={**params, "start": "1990-01-01", "bucket": "5m"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+
+        response = await ac.get(
+            "/weather/aggregate", params={**params, "percentile": 95}, headers=headers
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_weather_endpoint_content_negotiation(override_db_dependencies):
+    """
+    Integration test for the formats offered by /weather/.
+
+    Verifies:
+    1. JSON output matches the WetherSchema representation.
+    2. MessagePack and Arrow responses carry the same data as columns.
+    3. An unsupported Accept header returns 406 Not Acceptable.
+    """
+    time_point = datetime(2025, 5, 1, 14, 0, 0, 123456)
+    async with TestingSessionLocal() as session:
+        await DB(session).set_weather_many([WeatherReading("Kyiv", 21.5, time_point)])
+
+    app = override_db_dependencies
+    params = {"city": "Kyiv", "day": "2025-05-01"}
+    token = {"x-token": "x" * 32}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/weather/", params=params, headers=token)
+        assert response.headers["content-type"] == "application/json"
+        expected = WetherSchema(
+            id=1, city="Kyiv", temperature=21.5, time_point=time_point
+        )
+        assert response.json() == [expected.model_dump(mode="json")]
+
+        response = await ac.get(
+            "/weather/",
+            params=params,
+            headers={**token, "accept": "application/msgpack"},
+        )
+        assert response.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == {
+            "temperature": [21.5],
+            "city": ["Kyiv"],
+            "time_point": [time_point.isoformat()],
+            "id": [1],
+        }
+
+        response = await ac.get(
+            "/weather/",
+            params=params,
+            headers={**token, "accept": "application/vnd.apache.arrow.stream"},
+        )
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        assert table.column("time_point").to_pylist() == [time_point]
+        assert table.column("temperature").to_pylist() == [21.5]
+
+        response = await ac.get(
+            "/weather/", params=params, headers={**token, "accept": "text/html"}
+        )
+        assert response.status_code == 406
+
+
+@pytest.mark.asyncio
+async def test_weather_endpoint_conditional_requests(
+    override_db_dependencies, weather_cache
+):
+    """
+    Integration test for HTTP validators and caching headers of /weather/.
+
+    Verifies:
+    1. A matching If-None-Match or If-Modified-Since returns 304 without a body.
+    2. The validators are cached with the payload: until the cache entry is
+       invalidated, a new reading changes neither.
+    3. The ETag differs between formats and changes once the entry is
+       invalidated, as ingestion does after storing a reading.
+    4. Past days are cacheable, the current day must be revalidated.
+    5. nginx may keep past days longer than the current day.
+    """
+    time_point = datetime(2025, 5, 1, 14)
+    async with TestingSessionLocal() as session:
+        await DB(session).set_weather_many([WeatherReading("Kyiv", 21.5, time_point)])
+
+    app = override_db_dependencies
+    params = {"city": "Kyiv", "day": "2025-05-01"}
+    token = {"x-token": "x" * 32}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/weather/", params=params, headers=token)
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+        assert response.headers["cache-control"].startswith("public, max-age=")
+        assert response.headers["x-accel-expires"] == str(config.cache.edge_past_ttl)
+
+        response = await ac.get(
+            "/weather/", params=params, headers={**token, "if-none-match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = await ac.get(
+            "/weather/",
+            params=params,
+            headers={**token, "if-modified-since": last_modified},
+        )
+        assert response.status_code == 304
+
+        response = await ac.get(
+            "/weather/",
+            params=params,
+            headers={**token, "if-none-match": etag, "accept": "application/msgpack"},
+        )
+        assert response.status_code == 200
+
+        async with TestingSessionLocal() as session:
+            await DB(session).set_weather_many(
+                [WeatherReading("Kyiv", 22.0, datetime(2025, 5, 1, 10))]
+            )
+        response = await ac.get(
+            "/weather/", params=params, headers={**token, "if-none-match": etag}
+        )
+        assert response.status_code == 304
+
+        await weather_cache.invalidate([("Kyiv", date(2025, 5, 1))])
+        response = await ac.get(
+            "/weather/", params=params, headers={**token, "if-none-match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert [i["temperature"] for i in response.json()] == [21.5, 22.0]
+
+        response = await ac.get("/weather/", params={"city": "Kyiv"}, headers=token)
+        assert response.headers["cache-control"] == "no-cache"
+        assert response.headers["x-accel-expires"] == str(config.cache.edge_today_ttl)
+
+
+@pytest.mark.asyncio
+async def test_weather_endpoint_revalidates_a_miss_without_rows(
+    override_db_dependencies, weather_cache, monkeypatch
+):
+    """
+    Integration test for conditional requests that miss the response cache.
+
+    Verifies:
+    1. A matching If-None-Match or If-Modified-Since returns 304 with the
+       validators of a full response, without loading the rows.
+    2. Nothing is cached by a 304.
+    3. A stale ETag still loads the rows and returns 200.
+    """
+    time_point = datetime(2025, 5, 1, 14)
+    async with TestingSessionLocal() as session:
+        await DB(session).set_weather_many([WeatherReading("Kyiv", 21.5, time_point)])
+
+    app = override_db_dependencies
+    params = {"city": "Kyiv", "day": "2025-05-01"}
+    token = {"x-token": "x" * 32}
+    loads = []
+    get_weather_rows = DB.get_weather_rows
+
+    async def counting_get_weather_rows(self, city, day):
+        loads.append((city, day))
+        return await get_weather_rows(self, city, day)
+
+    monkeypatch.setattr(DB, "get_weather_rows", counting_get_weather_rows)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.get("/weather/", params=params, headers=token)
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+        await weather_cache.invalidate([("Kyiv", date(2025, 5, 1))])
+        loads.clear()
+
+        for conditional in (
+            {"if-none-match": etag},
+            {"if-modified-since": last_modified},
+        ):
+            response = await ac.get(
+                "/weather/", params=params, headers={**token, **conditional}
+            )
+            assert response.status_code == 304
+            assert response.headers["etag"] == etag
+            assert response.headers["last-modified"] == last_modified
+        assert loads == []
+        assert await weather_cache.get("Kyiv", date(2025, 5, 1)) is None
+
+        response = await ac.get(
+            "/weather/", params=params, headers={**token, "if-none-match": 'W/"0-0"'}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] == etag
+        assert loads == [("Kyiv", date(2025, 5, 1))]
+
+
+def test_negotiate():
+    """Accept headers are resolved by quality, with JSON for wildcards."""
+    assert negotiate(None).name == "json"
+    assert negotiate("text/html, */*;q=0.1").name == "json"
+    assert negotiate("application/json;q=0.5, application/msgpack").name == "msgpack"
+    assert negotiate("application/msgpack;q=0, text/html") is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(override_db_dependencies):
+    """
+    Integration test for the Prometheus endpoint.
+
+    Asserts:
+    - Request latency is labelled with the route template and status code.
+    - Database and cache metrics are exposed.
+    """
+    app = override_db_dependencies
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        await ac.get(
+            "/weather/",
+            params={"city": "Kyiv", "day": "2025-05-01"},
+            headers={"x-token": "x" * 32},
+        )
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/weather/",'
+        'status="200"}' in body
+    )
+    assert 'db_query_duration_seconds_count{operation="get_weather_rows"}' in body
+    assert 'cache_requests_total{result="miss",tier="redis"}' in body